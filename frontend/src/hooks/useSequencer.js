@@ -94,13 +94,19 @@ export function useSequencer() {
     };
 
     ws.onmessage = (event) => {
+      // Completion events arrive batched: {type: 'batch', events: [...]}
+      // (a bare event object is still accepted)
       const data = JSON.parse(event.data);
-      console.log('✅ Received completion event:', data);
+      const events = data.type === 'batch' || Array.isArray(data.events) ? data.events : [data];
 
-      // Play next melody in sequence using ref to get latest function
-      if (playNextRef.current) {
-        playNextRef.current();
-      }
+      events.forEach((completion) => {
+        console.log('✅ Received completion event:', completion);
+
+        // Play next melody in sequence using ref to get latest function
+        if (playNextRef.current) {
+          playNextRef.current();
+        }
+      });
     };
 
     ws.onerror = (error) => {
@@ -1,6 +1,28 @@
-from typing import List, Dict, Optional
-from music21 import stream, note, analysis, key as m21_key
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Union
+import numpy as np
+from music21 import stream, note, analysis, pitch, key as m21_key
 from scale_utils import get_scale_intervals
+from note_array import NoteArray
+
+# Validator methods accept either note dicts or a NoteArray
+Notes = Union[List[Dict], NoteArray]
+
+# Survivor count above which full validation reports are built in worker
+# processes. A single report costs tens of microseconds, so the pool only
+# pays for its startup on very large batches.
+PARALLEL_VALIDATION_MIN = 2048
+
+# Valid ending patterns, keyed by the last two scale degrees
+_CADENCE_LOOKUP: Dict[tuple, str] = {
+    (7, 1): 'Leading tone to tonic',
+    (2, 1): 'Supertonic to tonic',
+    (5, 1): 'Dominant to tonic',
+    (4, 1): 'Subdominant to tonic',
+    (1, 1): 'Tonic to tonic',  # Acceptable
+}
 
 class MelodyValidator:
     """
@@ -13,20 +35,42 @@ class MelodyValidator:
         self.root_note = root_note
         self.scale_intervals = get_scale_intervals(scale_type)
 
-    def validate_all(self, melody_notes: List[Dict],
+        self._root_pc = pitch.Pitch(root_note).pitchClass
+
+        # Boolean mask over intervals-from-root: True where the interval is in the scale
+        self._scale_mask = np.zeros(12, dtype=bool)
+        self._scale_mask[list(self.scale_intervals)] = True
+
+        # Scale degree (1-7) for every interval from root; out-of-scale intervals
+        # map to the degree of the closest scale interval. The dict serves scalar
+        # lookups, the array serves vectorized ones.
+        self._interval_to_degree = {}
+        for interval in range(12):
+            if interval in self.scale_intervals:
+                idx = self.scale_intervals.index(interval)
+            else:
+                closest = min(self.scale_intervals, key=lambda x: abs(x - interval))
+                idx = self.scale_intervals.index(closest)
+            self._interval_to_degree[interval] = (idx % 7) + 1
+        self._degree_lut = np.array([self._interval_to_degree[i] for i in range(12)], dtype=np.int8)
+
+    def validate_all(self, melody_notes: Notes,
                     check_key: bool = True,
                     check_cadence: bool = True,
                     check_range: bool = True,
-                    reference_range: Optional[tuple] = None) -> Dict:
+                    reference_range: Optional[tuple] = None,
+                    short_circuit: bool = False) -> Dict:
         """
         Run all validation checks on a melody.
 
         Args:
-            melody_notes: List of note dicts
+            melody_notes: List of note dicts or a NoteArray
             check_key: Whether to validate key membership
             check_cadence: Whether to validate cadential patterns
             check_range: Whether to validate pitch range
             reference_range: (min_midi, max_midi) for range check
+            short_circuit: Stop at the first failing check (remaining checks
+                are omitted from the results)
 
         Returns:
             Dict with validation results and pass/fail for each check
@@ -40,23 +84,32 @@ class MelodyValidator:
             results['checks']['empty_melody'] = {'passed': False, 'message': 'Empty melody'}
             return results
 
+        # Pull note fields into arrays once and share them across checks
+        arrays = self._extract_arrays(melody_notes)
+
         # Key check
         if check_key:
-            key_result = self.check_key_membership(melody_notes)
+            key_result = self.check_key_membership(melody_notes, arrays)
             results['checks']['key_membership'] = key_result
+            if short_circuit and not key_result['passed']:
+                return results
 
         # Cadence check
         if check_cadence:
-            cadence_result = self.check_cadence(melody_notes)
+            cadence_result = self.check_cadence(melody_notes, arrays)
             results['checks']['cadence'] = cadence_result
+            if short_circuit and not cadence_result['passed']:
+                return results
 
         # Range check
         if check_range:
-            range_result = self.check_range(melody_notes, reference_range)
+            range_result = self.check_range(melody_notes, reference_range, arrays)
             results['checks']['range'] = range_result
+            if short_circuit and not range_result['passed']:
+                return results
 
         # Rhythm coherence check
-        rhythm_result = self.check_rhythm_coherence(melody_notes)
+        rhythm_result = self.check_rhythm_coherence(melody_notes, arrays)
         results['checks']['rhythm_coherence'] = rhythm_result
 
         # Overall pass: all checked items must pass
@@ -69,55 +122,53 @@ class MelodyValidator:
 
         return results
 
-    def check_key_membership(self, melody_notes: List[Dict]) -> Dict:
+    def check_key_membership(self, melody_notes: Notes,
+                             arrays: Optional[tuple] = None) -> Dict:
         """
         Check if melody notes belong to the specified key/scale.
 
+        Args:
+            melody_notes: Notes to check
+            arrays: Optional (midis, times, durations) from _extract_arrays
+
         Returns:
             Dict with passed (bool) and details
         """
         if not melody_notes:
             return {'passed': False, 'message': 'Empty melody'}
 
-        # Get scale pitch classes
-        scale_pc = set(self.scale_intervals)
+        midis, _, _ = arrays if arrays is not None else self._extract_arrays(melody_notes)
 
-        # Convert root note to pitch class
-        from music21 import pitch
-        root_pitch = pitch.Pitch(self.root_note)
-        root_pc = root_pitch.pitchClass
-
-        # Check each note
-        non_scale_notes = []
-        for i, n in enumerate(melody_notes):
-            midi = n['midi']
-            note_pc = midi % 12
-
-            # Calculate interval from root
-            interval = (note_pc - root_pc) % 12
-
-            if interval not in scale_pc:
-                non_scale_notes.append({
-                    'index': i,
-                    'midi': midi,
-                    'interval_from_root': interval
-                })
+        # Interval from root for every note, tested against the scale mask in one pass
+        intervals = (midis - self._root_pc) % 12
+        in_scale = self._scale_mask[intervals]
 
         # Pass if >= 90% of notes are in scale
-        in_scale_count = len(melody_notes) - len(non_scale_notes)
+        in_scale_count = int(in_scale.sum())
         percentage = (in_scale_count / len(melody_notes)) * 100
 
         passed = percentage >= 90
 
+        # Only report violations when the check fails (limit to first 5)
+        non_scale_notes = []
+        if not passed:
+            for i in np.flatnonzero(~in_scale)[:5]:
+                non_scale_notes.append({
+                    'index': int(i),
+                    'midi': int(midis[i]),
+                    'interval_from_root': int(intervals[i])
+                })
+
         return {
             'passed': passed,
             'in_scale_percentage': round(percentage, 2),
             'in_scale_count': in_scale_count,
             'total_notes': len(melody_notes),
-            'non_scale_notes': non_scale_notes[:5]  # Limit to first 5 violations
+            'non_scale_notes': non_scale_notes
         }
 
-    def check_cadence(self, melody_notes: List[Dict]) -> Dict:
+    def check_cadence(self, melody_notes: Notes,
+                      arrays: Optional[tuple] = None) -> Dict:
         """
         Check if melody has valid cadential patterns.
 
@@ -127,6 +178,10 @@ class MelodyValidator:
         - 5 → 1 (dominant to tonic)
         - 4 → 1 (subdominant to tonic)
 
+        Args:
+            melody_notes: Notes to check
+            arrays: Optional (midis, times, durations) from _extract_arrays
+
         Returns:
             Dict with passed (bool) and cadence type
         """
@@ -134,30 +189,26 @@ class MelodyValidator:
             return {'passed': False, 'message': 'Melody too short for cadence'}
 
         # Get last 2-4 notes for cadence detection
-        cadence_notes = melody_notes[-4:] if len(melody_notes) >= 4 else melody_notes[-2:]
+        cadence_len = 4 if len(melody_notes) >= 4 else 2
+        if arrays is not None:
+            cadence_midis = arrays[0][-cadence_len:]
+        else:
+            cadence_midis = self._extract_arrays(melody_notes[-cadence_len:])[0]
 
-        # Convert to scale degrees
-        scale_degrees = [self._get_scale_degree(n['midi']) for n in cadence_notes]
+        # Convert to scale degrees (only a handful of notes, so plain dict lookups)
+        degree_of = self._interval_to_degree
+        scale_degrees = [degree_of[i] for i in ((cadence_midis - self._root_pc) % 12).tolist()]
 
         # Check for valid cadential patterns
-        last_two = scale_degrees[-2:]
-
-        # Valid ending patterns
-        valid_cadences = [
-            ([7, 1], 'Leading tone to tonic'),
-            ([2, 1], 'Supertonic to tonic'),
-            ([5, 1], 'Dominant to tonic'),
-            ([4, 1], 'Subdominant to tonic'),
-            ([1, 1], 'Tonic to tonic'),  # Acceptable
-        ]
-
-        for pattern, description in valid_cadences:
-            if last_two == pattern:
-                return {
-                    'passed': True,
-                    'cadence_type': description,
-                    'scale_degrees': scale_degrees
-                }
+        last_two = (scale_degrees[-2], scale_degrees[-1])
+
+        description = _CADENCE_LOOKUP.get(last_two)
+        if description:
+            return {
+                'passed': True,
+                'cadence_type': description,
+                'scale_degrees': scale_degrees
+            }
 
         # Check if at least ends on tonic
         if last_two[-1] == 1:
@@ -171,17 +222,19 @@ class MelodyValidator:
             'passed': False,
             'cadence_type': 'No valid cadence',
             'scale_degrees': scale_degrees,
-            'last_interval': last_two
+            'last_interval': list(last_two)
         }
 
-    def check_range(self, melody_notes: List[Dict],
-                   reference_range: Optional[tuple] = None) -> Dict:
+    def check_range(self, melody_notes: Notes,
+                   reference_range: Optional[tuple] = None,
+                   arrays: Optional[tuple] = None) -> Dict:
         """
         Check if melody stays within acceptable pitch range.
 
         Args:
             melody_notes: Notes to check
             reference_range: (min_midi, max_midi) or None for default (C3-C6)
+            arrays: Optional (midis, times, durations) from _extract_arrays
 
         Returns:
             Dict with passed (bool) and range info
@@ -189,9 +242,9 @@ class MelodyValidator:
         if not melody_notes:
             return {'passed': False, 'message': 'Empty melody'}
 
-        pitches = [n['midi'] for n in melody_notes]
-        min_pitch = min(pitches)
-        max_pitch = max(pitches)
+        midis, _, _ = arrays if arrays is not None else self._extract_arrays(melody_notes)
+        min_pitch = int(midis.min())
+        max_pitch = int(midis.max())
 
         # Use reference range or default
         if reference_range:
@@ -220,7 +273,8 @@ class MelodyValidator:
             }
         }
 
-    def check_rhythm_coherence(self, melody_notes: List[Dict]) -> Dict:
+    def check_rhythm_coherence(self, melody_notes: Notes,
+                               arrays: Optional[tuple] = None) -> Dict:
         """
         Check for rhythmic coherence.
 
@@ -228,27 +282,32 @@ class MelodyValidator:
         - More than 50% rest density
         - Excessive very short notes (orphaned 32nd notes)
 
+        Args:
+            melody_notes: Notes to check
+            arrays: Optional (midis, times, durations) from _extract_arrays
+
         Returns:
             Dict with passed (bool) and rhythm analysis
         """
         if not melody_notes:
             return {'passed': False, 'message': 'Empty melody'}
 
+        _, times, durations = arrays if arrays is not None else self._extract_arrays(melody_notes)
+
         # Calculate total duration
-        start_time = melody_notes[0]['time']
-        end_time = melody_notes[-1]['time'] + melody_notes[-1]['duration']
-        total_time = end_time - start_time
+        total_time = float(times[-1] + durations[-1] - times[0])
 
         # Calculate sounding time
-        sounding_time = sum(n['duration'] for n in melody_notes)
+        sounding_time = float(durations.sum())
 
         # Rest density
         rest_time = total_time - sounding_time
         rest_density = rest_time / total_time if total_time > 0 else 0
 
         # Check for very short notes (< 0.1 seconds)
-        very_short_notes = [n for n in melody_notes if n['duration'] < 0.1]
-        short_note_ratio = len(very_short_notes) / len(melody_notes)
+        short_mask = durations < 0.1
+        very_short_count = int(short_mask.sum())
+        short_note_ratio = very_short_count / len(durations)
 
         # Pass criteria
         rest_ok = rest_density <= 0.5
@@ -261,35 +320,32 @@ class MelodyValidator:
             'rest_density': round(rest_density, 3),
             'short_note_ratio': round(short_note_ratio, 3),
             'total_notes': len(melody_notes),
-            'very_short_notes_count': len(very_short_notes),
+            'very_short_notes_count': very_short_count,
             'checks': {
                 'rest_density_ok': rest_ok,
                 'short_notes_ok': short_notes_ok
             }
         }
 
-    def _get_scale_degree(self, midi_note: int) -> int:
+    def _extract_arrays(self, melody_notes: Notes) -> tuple:
         """
-        Get scale degree (1-7) for a MIDI note in the current key.
+        Extract (midis, times, durations) NumPy arrays from note dicts.
+        A NoteArray already holds them and is returned without copying.
         """
-        from music21 import pitch
-
-        note_pc = midi_note % 12
-        root_pitch = pitch.Pitch(self.root_note)
-        root_pc = root_pitch.pitchClass
-
-        # Calculate interval from root
-        interval = (note_pc - root_pc) % 12
+        if isinstance(melody_notes, NoteArray):
+            return melody_notes.midi, melody_notes.time, melody_notes.duration
 
-        # Find closest scale degree
-        for i, scale_interval in enumerate(self.scale_intervals):
-            if scale_interval == interval:
-                return (i % 7) + 1  # Return 1-7
+        count = len(melody_notes)
+        midis = np.fromiter((n['midi'] for n in melody_notes), dtype=np.int16, count=count)
+        times = np.fromiter((n['time'] for n in melody_notes), dtype=np.float64, count=count)
+        durations = np.fromiter((n['duration'] for n in melody_notes), dtype=np.float64, count=count)
+        return midis, times, durations
 
-        # Not in scale - return closest
-        closest = min(self.scale_intervals, key=lambda x: abs(x - interval))
-        idx = self.scale_intervals.index(closest)
-        return (idx % 7) + 1
+    def _get_scale_degree(self, midi_note: int) -> int:
+        """
+        Get scale degree (1-7) for a MIDI note in the current key.
+        """
+        return self._interval_to_degree[(midi_note - self._root_pc) % 12]
 
     def filter_valid_variations(self, variations: List[Dict],
                                reference_range: Optional[tuple] = None) -> List[Dict]:
@@ -303,15 +359,122 @@ class MelodyValidator:
         Returns:
             Filtered list of variations
         """
-        valid = []
+        if not variations:
+            return []
+
+        # Reject failing variations in one batched pass, then build the full
+        # validation report only for the survivors
+        passes = self._batch_passes([v.get('notes', []) for v in variations], reference_range)
 
-        for variation in variations:
-            notes = variation.get('notes', [])
-            validation = self.validate_all(notes, reference_range=reference_range)
+        survivors = [v for v, batch_passed in zip(variations, passes) if batch_passed]
+        validations = self._validate_many([v.get('notes', []) for v in survivors],
+                                          reference_range)
+
+        valid = []
 
+        for variation, validation in zip(survivors, validations):
             if validation['passed']:
                 # Add validation metadata
                 variation['validation'] = validation
                 valid.append(variation)
 
         return valid
+
+    def _validate_many(self, melodies: List[Notes],
+                       reference_range: Optional[tuple] = None) -> List[Dict]:
+        """
+        Run validate_all (short-circuiting) over many melodies, spreading the
+        work over a process pool when the batch is large enough to benefit.
+        """
+        workers = os.cpu_count() or 1
+
+        # Inside a pool worker (the API runs validation in workers.py's pool)
+        # every CPU is already busy; a nested pool per request would only
+        # multiply the process count
+        if (len(melodies) < PARALLEL_VALIDATION_MIN or workers < 2
+                or multiprocessing.parent_process() is not None):
+            return [self.validate_all(notes, reference_range=reference_range,
+                                      short_circuit=True)
+                    for notes in melodies]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.scale_type, self.root_note)) as ex:
+            return list(ex.map(_validate_one, melodies,
+                               [reference_range] * len(melodies),
+                               chunksize=max(1, len(melodies) // (workers * 4))))
+
+    def _batch_passes(self, melodies: List[Notes],
+                      reference_range: Optional[tuple] = None) -> np.ndarray:
+        """
+        Evaluate all constraints for many melodies at once.
+
+        Notes are packed into padded (melodies x max_notes) arrays with a
+        validity mask, and each check from validate_all is applied as a
+        broadcast operation.
+
+        Returns:
+            Boolean array, True where a melody passes every check
+        """
+        lengths = np.array([len(m) for m in melodies], dtype=np.int64)
+        max_len = int(lengths.max())
+        if max_len == 0:
+            return np.zeros(len(melodies), dtype=bool)
+
+        mask = np.arange(max_len) < lengths[:, None]
+        midis = np.zeros(mask.shape, dtype=np.int16)
+        times = np.zeros(mask.shape, dtype=np.float64)
+        durations = np.zeros(mask.shape, dtype=np.float64)
+
+        if any(isinstance(m, NoteArray) for m in melodies):
+            parts = [self._extract_arrays(m) for m in melodies]
+            midis[mask] = np.concatenate([p[0] for p in parts])
+            times[mask] = np.concatenate([p[1] for p in parts])
+            durations[mask] = np.concatenate([p[2] for p in parts])
+        else:
+            # All dicts: flatten once so each field is a single fromiter
+            midis[mask], times[mask], durations[mask] = self._extract_arrays(
+                [n for m in melodies for n in m])
+
+        rows = np.arange(len(melodies))
+        last = np.maximum(lengths - 1, 0)
+        safe_lengths = np.maximum(lengths, 1)
+
+        # Key membership: >= 90% of notes in scale
+        in_scale = self._scale_mask[(midis - self._root_pc) % 12] & mask
+        key_ok = (in_scale.sum(axis=1) / safe_lengths) * 100 >= 90
+
+        # Cadence: every accepted pattern ends on the tonic
+        last_degrees = self._degree_lut[(midis[rows, last] - self._root_pc) % 12]
+        cadence_ok = (lengths >= 2) & (last_degrees == 1)
+
+        # Range
+        if reference_range:
+            min_allowed, max_allowed = reference_range
+        else:
+            min_allowed = 48  # C3
+            max_allowed = 84  # C6
+        lowest = np.where(mask, midis, 127).min(axis=1)
+        highest = np.where(mask, midis, 0).max(axis=1)
+        range_ok = (lowest >= min_allowed) & (highest <= max_allowed)
+
+        # Rhythm coherence: rest density and short-note ratio
+        total_time = times[rows, last] + durations[rows, last] - times[:, 0]
+        rest_time = total_time - durations.sum(axis=1)
+        rest_density = np.divide(rest_time, total_time, out=np.zeros_like(total_time),
+                                 where=total_time > 0)
+        short_ratio = ((durations < 0.1) & mask).sum(axis=1) / safe_lengths
+        rhythm_ok = (rest_density <= 0.5) & (short_ratio <= 0.3)
+
+        return (lengths > 0) & key_ok & cadence_ok & range_ok & rhythm_ok
+
+# Per-process validator for parallel validation, built once by the pool initializer
+_worker_validator: Optional[MelodyValidator] = None
+
+def _init_worker(scale_type: str, root_note: str) -> None:
+    global _worker_validator
+    _worker_validator = MelodyValidator(scale_type, root_note)
+
+def _validate_one(melody_notes: Notes,
+                  reference_range: Optional[tuple] = None) -> Dict:
+    return _worker_validator.validate_all(melody_notes, reference_range=reference_range,
+                                          short_circuit=True)
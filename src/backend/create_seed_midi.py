@@ -3,7 +3,10 @@
 Create simple seed melodies as MIDI files for testing.
 """
 
-from music21 import stream, note, tempo, meter, duration
+from concurrent.futures import ThreadPoolExecutor
+from midi_utils import write_midi_file
+
+SECONDS_PER_BEAT = 0.5  # 120 BPM
 
 def create_melody(name, pitches, durations=None):
     """
@@ -13,91 +16,92 @@ def create_melody(name, pitches, durations=None):
         name: Output filename (without .mid extension)
         pitches: List of MIDI note numbers
         durations: List of durations in quarter notes (default: all 1.0)
+
+    Returns:
+        Name of the written file
     """
     if durations is None:
         durations = [1.0] * len(pitches)
 
-    s = stream.Stream()
-    s.append(tempo.TempoIndication(number=120))
-    s.append(meter.TimeSignature('4/4'))
-
+    notes = []
     offset = 0
     for pitch, dur in zip(pitches, durations):
-        n = note.Note(pitch)
-        n.duration = duration.Duration(quarterLength=dur)
-        s.insert(offset, n)
+        notes.append({
+            'midi': pitch,
+            'time': offset * SECONDS_PER_BEAT,
+            'duration': dur * SECONDS_PER_BEAT,
+            'velocity': 0.7
+        })
         offset += dur
 
     filename = f"{name}.mid"
-    s.write('midi', fp=filename)
-    print(f"✓ Created: {filename} ({len(pitches)} notes)")
-
-print("=" * 60)
-print("Creating Test Seed Melodies")
-print("=" * 60)
-print()
-
-# 1. C Major Scale
-create_melody(
-    name="seed_c_major_scale",
-    pitches=[60, 62, 64, 65, 67, 69, 71, 72],  # C D E F G A B C
-    durations=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]
-)
-
-# 2. Simple Arpeggio (C E G C)
-create_melody(
-    name="seed_c_major_arpeggio",
-    pitches=[60, 64, 67, 72],  # C E G C
-    durations=[1.0, 1.0, 1.0, 2.0]
-)
-
-# 3. Twinkle Twinkle Little Star (opening)
-create_melody(
-    name="seed_twinkle_twinkle",
-    pitches=[60, 60, 67, 67, 69, 69, 67],  # C C G G A A G
-    durations=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]
-)
-
-# 4. Mary Had a Little Lamb (opening)
-create_melody(
-    name="seed_mary_little_lamb",
-    pitches=[64, 62, 60, 62, 64, 64, 64],  # E D C D E E E
-    durations=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]
-)
-
-# 5. Happy Birthday (simplified opening)
-create_melody(
-    name="seed_happy_birthday",
-    pitches=[60, 60, 62, 60, 65, 64],  # C C D C F E
-    durations=[0.75, 0.25, 1.0, 1.0, 1.0, 2.0]
-)
-
-# 6. Short Melodic Fragment
-create_melody(
-    name="seed_fragment",
-    pitches=[60, 64, 67, 65, 62, 60],  # C E G F D C
-    durations=[0.5, 0.5, 1.0, 0.5, 0.5, 2.0]
-)
-
-# 7. Minor Scale (A minor)
-create_melody(
-    name="seed_a_minor_scale",
-    pitches=[69, 71, 60, 62, 64, 65, 67, 69],  # A B C D E F G A
-    durations=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]
-)
-
-# 8. Blues-ish Phrase
-create_melody(
-    name="seed_blues_phrase",
-    pitches=[60, 63, 65, 66, 67, 65, 60],  # C Eb F Gb G F C
-    durations=[1.0, 0.5, 0.5, 0.5, 0.5, 1.0, 2.0]
-)
-
-print()
-print("=" * 60)
-print("Created 8 seed MIDI files")
-print("=" * 60)
-print("\nNow you can test with:")
-print("  python import_and_vary.py seed_c_major_scale.mid")
-print("  python import_and_vary.py seed_twinkle_twinkle.mid minor A")
-print("  python import_and_vary.py seed_blues_phrase.mid blues C")
+    write_midi_file(notes, filename)
+    return filename
+
+# (name, pitches, durations in quarter notes)
+SEED_MELODIES = [
+    # 1. C Major Scale
+    ("seed_c_major_scale",
+     [60, 62, 64, 65, 67, 69, 71, 72],  # C D E F G A B C
+     [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]),
+
+    # 2. Simple Arpeggio (C E G C)
+    ("seed_c_major_arpeggio",
+     [60, 64, 67, 72],  # C E G C
+     [1.0, 1.0, 1.0, 2.0]),
+
+    # 3. Twinkle Twinkle Little Star (opening)
+    ("seed_twinkle_twinkle",
+     [60, 60, 67, 67, 69, 69, 67],  # C C G G A A G
+     [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]),
+
+    # 4. Mary Had a Little Lamb (opening)
+    ("seed_mary_little_lamb",
+     [64, 62, 60, 62, 64, 64, 64],  # E D C D E E E
+     [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]),
+
+    # 5. Happy Birthday (simplified opening)
+    ("seed_happy_birthday",
+     [60, 60, 62, 60, 65, 64],  # C C D C F E
+     [0.75, 0.25, 1.0, 1.0, 1.0, 2.0]),
+
+    # 6. Short Melodic Fragment
+    ("seed_fragment",
+     [60, 64, 67, 65, 62, 60],  # C E G F D C
+     [0.5, 0.5, 1.0, 0.5, 0.5, 2.0]),
+
+    # 7. Minor Scale (A minor)
+    ("seed_a_minor_scale",
+     [69, 71, 60, 62, 64, 65, 67, 69],  # A B C D E F G A
+     [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 2.0]),
+
+    # 8. Blues-ish Phrase
+    ("seed_blues_phrase",
+     [60, 63, 65, 66, 67, 65, 60],  # C Eb F Gb G F C
+     [1.0, 0.5, 0.5, 0.5, 0.5, 1.0, 2.0]),
+]
+
+def main():
+    print("=" * 60)
+    print("Creating Test Seed Melodies")
+    print("=" * 60)
+    print()
+
+    # Files are independent, so write them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        filenames = list(executor.map(lambda seed: create_melody(*seed), SEED_MELODIES))
+
+    for filename, (_, pitches, _) in zip(filenames, SEED_MELODIES):
+        print(f"✓ Created: {filename} ({len(pitches)} notes)")
+
+    print()
+    print("=" * 60)
+    print(f"Created {len(filenames)} seed MIDI files")
+    print("=" * 60)
+    print("\nNow you can test with:")
+    print("  python import_and_vary.py seed_c_major_scale.mid")
+    print("  python import_and_vary.py seed_twinkle_twinkle.mid minor A")
+    print("  python import_and_vary.py seed_blues_phrase.mid blues C")
+
+if __name__ == "__main__":
+    main()
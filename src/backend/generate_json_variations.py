@@ -3,11 +3,24 @@
 Generate variations from ototope-i.json and export as JSON (not MIDI).
 """
 
+import functools
 import json
 import os
+import numpy as np
+import orjson
 from variations import VariationGenerator
 from constraints import MelodyValidator
 
+# Generators and validators hold only per-key lookup tables, so one instance
+# per (scale, key) is shared by every melody in that key
+@functools.lru_cache(maxsize=32)
+def _get_generator(scale, key):
+    return VariationGenerator(scale, key)
+
+@functools.lru_cache(maxsize=32)
+def _get_validator(scale, key):
+    return MelodyValidator(scale, key)
+
 def convert_json_to_notes(layer_data):
     """
     Convert JSON melody format to our note format.
@@ -53,31 +66,23 @@ def convert_notes_to_json_format(notes, original_metadata):
     if not notes:
         return None
 
+    midis = [note['midi'] for note in notes]
+    velocities = [note['velocity'] for note in notes]
+    durations = [note['duration'] for note in notes]
+    times = np.array([note['time'] for note in notes], dtype=float)
+
     # Calculate total duration
-    total_duration = notes[-1]['time'] + notes[-1]['duration']
+    total_duration = float(times[-1] + durations[-1])
 
     # Build notes array
-    json_notes = []
-    for note in notes:
-        json_notes.append({
-            "midi": note['midi'],
-            "vel": note['velocity'],
-            "dur": note['duration']  # Keeping as absolute for now
-        })
+    json_notes = [
+        {"midi": m, "vel": v, "dur": d}  # Keeping dur as absolute for now
+        for m, v, d in zip(midis, velocities, durations)
+    ]
 
-    # Build timing array (normalized 0-1)
-    timing = []
-    for i, note in enumerate(notes):
-        if i == 0:
-            timing.append(0)
-        else:
-            time_diff = note['time'] - notes[i-1]['time']
-            timing.append(time_diff / total_duration)
-
-    # Add final spacing
-    if notes:
-        final_gap = total_duration - notes[-1]['time']
-        timing.append(final_gap / total_duration)
+    # Build timing array (normalized 0-1): inter-onset gaps plus final spacing
+    gaps = np.append(np.diff(times), total_duration - times[-1]) / total_duration
+    timing = [0] + [round(t, 4) for t in gaps.tolist()]
 
     # Create output structure
     return {
@@ -88,7 +93,7 @@ def convert_notes_to_json_format(notes, original_metadata):
             "scale": original_metadata.get('scale', 'major')
         },
         "notes": json_notes,
-        "timing": [round(t, 4) for t in timing]
+        "timing": timing
     }
 
 def main():
@@ -109,78 +114,86 @@ def main():
     melodies = data['melodies']
     print(f"\nFound {len(melodies)} melodies")
 
-    # Create output structure
-    output_data = {
-        "source": "ototope-i.json",
-        "generator": "melodyGen",
-        "melodies": {}
-    }
-
-    # Process each melody
-    for melody_name, melody_data in melodies.items():
-        print(f"\nProcessing: {melody_name}")
-
-        if 'layer1' not in melody_data['layers']:
-            print(f"  Skipping - no layer1")
-            continue
-
-        layer1 = melody_data['layers']['layer1']
-
-        # Convert to our format
-        notes, original_metadata = convert_json_to_notes(layer1)
-        key = original_metadata['key']
-        scale = original_metadata['scale']
-
-        print(f"  Notes: {len(notes)}, Key: {key} {scale}")
-
-        # Generate variations
-        generator = VariationGenerator(scale, key)
-        variations = generator.generate_batch(notes, count=20)
-        print(f"  Generated: {len(variations)} variations")
-
-        # Validate
-        validator = MelodyValidator(scale, key)
-        valid = validator.filter_valid_variations(variations)
-        print(f"  Valid: {len(valid)}/{len(variations)}")
-
-        # Use all variations if none are valid
-        if not valid:
-            print(f"  Using all variations (validation disabled)")
-            valid = variations[:10]
-
-        # Convert variations to JSON format
-        melody_variations = {
-            "original": {
-                "layer1": layer1
-            },
-            "variations": {}
-        }
-
-        for i, var in enumerate(valid[:10], 1):
-            var_name = f"var_{i:02d}_{var['metadata']['variation_type']}"
-            json_layer = convert_notes_to_json_format(var['notes'], original_metadata)
+    # Melodies are streamed into the output file one block at a time, so the
+    # full result set is never held in memory alongside its serialized form
+    output_path = 'output/variations.json'
+    os.makedirs('output', exist_ok=True)
 
-            if json_layer:
-                melody_variations["variations"][var_name] = {
-                    "method": var['metadata']['method'],
-                    "layer1": json_layer
+    # Written under a temporary name and moved into place once complete, so
+    # a failure part-way never leaves a truncated variations.json behind
+    partial_path = output_path + '.partial'
+    try:
+        with open(partial_path, 'wb') as out:
+            out.write(b'{\n  "source": "ototope-i.json",\n  "generator": "melodyGen",\n  "melodies": {')
+            processed = 0
+
+            # Process each melody
+            for melody_name, melody_data in melodies.items():
+                print(f"\nProcessing: {melody_name}")
+
+                if 'layer1' not in melody_data['layers']:
+                    print(f"  Skipping - no layer1")
+                    continue
+
+                layer1 = melody_data['layers']['layer1']
+
+                # Convert to our format
+                notes, original_metadata = convert_json_to_notes(layer1)
+                key = original_metadata['key']
+                scale = original_metadata['scale']
+
+                print(f"  Notes: {len(notes)}, Key: {key} {scale}")
+
+                # Generate variations
+                generator = _get_generator(scale, key)
+                variations = generator.generate_batch(notes, count=20)
+                print(f"  Generated: {len(variations)} variations")
+
+                # Validate
+                validator = _get_validator(scale, key)
+                valid = validator.filter_valid_variations(variations)
+                print(f"  Valid: {len(valid)}/{len(variations)}")
+
+                # Use all variations if none are valid
+                if not valid:
+                    print(f"  Using all variations (validation disabled)")
+                    valid = variations[:10]
+
+                # Convert variations to JSON format
+                melody_variations = {
+                    "original": {
+                        "layer1": layer1
+                    },
+                    "variations": {}
                 }
-                print(f"  ✓ {var_name}: {var['metadata']['method']}")
 
-        output_data["melodies"][melody_name] = melody_variations
+                for i, var in enumerate(valid[:10], 1):
+                    var_name = f"var_{i:02d}_{var['metadata']['variation_type']}"
+                    json_layer = convert_notes_to_json_format(var['notes'], original_metadata)
 
-    # Save to JSON file
-    output_path = 'output/variations.json'
-    os.makedirs('output', exist_ok=True)
+                    if json_layer:
+                        melody_variations["variations"][var_name] = {
+                            "method": var['metadata']['method'],
+                            "layer1": json_layer
+                        }
+                        print(f"  ✓ {var_name}: {var['metadata']['method']}")
+
+                block = orjson.dumps(melody_variations, option=orjson.OPT_INDENT_2)
+                out.write((b',' if processed else b'') + b'\n    ' + orjson.dumps(melody_name) + b': ')
+                out.write(block.replace(b'\n', b'\n    '))
+                processed += 1
 
-    with open(output_path, 'w') as f:
-        json.dump(output_data, f, indent=2)
+            out.write(b'\n  }\n}\n')
+    except BaseException:
+        os.remove(partial_path)
+        raise
+    os.replace(partial_path, output_path)
 
     print("\n" + "=" * 60)
     print("Complete!")
     print("=" * 60)
     print(f"\nSaved to: {output_path}")
-    print(f"Processed: {len(output_data['melodies'])} melodies")
+    print(f"Processed: {processed} melodies")
 
     # Show example structure
     print("\nExample output structure:")
@@ -6,9 +6,10 @@ Import a MIDI file and generate variations from it.
 import sys
 import os
 import mido
+from concurrent.futures import ThreadPoolExecutor
 from variations import VariationGenerator
 from constraints import MelodyValidator
-from music21 import stream, note, tempo, meter, duration
+from midi_utils import write_midi_file, get_midi_tempo, midi_file_to_notes
 
 def import_midi_file(filepath):
     """
@@ -25,64 +26,20 @@ def import_midi_file(filepath):
     mid = mido.MidiFile(filepath)
 
     # Get tempo
-    tempo_value = 500000  # Default 120 BPM
-    for msg in mid.tracks[0]:
-        if msg.type == 'set_tempo':
-            tempo_value = msg.tempo
-            break
+    tempo_value = get_midi_tempo(mid)
 
     bpm = 60000000 / tempo_value
     print(f"  Tempo: {int(bpm)} BPM")
 
     # Extract notes from first track with notes
-    notes = []
-    for track in mid.tracks:
-        active_notes = {}
-        current_time = 0
-
-        for msg in track:
-            current_time += msg.time
-
-            if msg.type == 'note_on' and msg.velocity > 0:
-                active_notes[msg.note] = (current_time, msg.velocity)
-            elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                if msg.note in active_notes:
-                    start_time, velocity = active_notes[msg.note]
-                    duration_ticks = current_time - start_time
-
-                    time_seconds = mido.tick2second(start_time, mid.ticks_per_beat, tempo_value)
-                    duration_seconds = mido.tick2second(duration_ticks, mid.ticks_per_beat, tempo_value)
-
-                    notes.append({
-                        'midi': msg.note,
-                        'time': time_seconds,
-                        'duration': duration_seconds,
-                        'velocity': velocity / 127.0
-                    })
-                    del active_notes[msg.note]
-
-        if notes:  # Use first track with notes
-            break
-
-    notes.sort(key=lambda n: n['time'])
+    notes = midi_file_to_notes(mid, tempo_value)
     print(f"  Extracted: {len(notes)} notes")
 
     return notes
 
 def export_to_midi(notes, filepath):
     """Export notes to MIDI file"""
-    s = stream.Stream()
-    s.append(tempo.TempoIndication(number=120))
-    s.append(meter.TimeSignature('4/4'))
-
-    for note_data in notes:
-        n = note.Note(note_data['midi'])
-        n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
-        n.offset = note_data['time'] * 2
-        n.volume.velocity = int(note_data.get('velocity', 0.7) * 127)
-        s.insert(n.offset, n)
-
-    s.write('midi', fp=filepath)
+    write_midi_file(notes, filepath)
 
 def main():
     if len(sys.argv) < 2:
@@ -153,16 +110,20 @@ def main():
 
     os.makedirs('output', exist_ok=True)
 
-    # Export seed
-    export_to_midi(seed_notes, 'output/00_original.mid')
-    print(f"\n✓ output/00_original.mid")
-
-    # Export top 10 variations
+    # Seed plus top 10 variations; files are independent, so write them concurrently
+    exports = [(seed_notes, 'output/00_original.mid', None)]
     for i, var in enumerate(valid[:10], 1):
         filename = f"output/{i:02d}_{var['metadata']['variation_type']}.mid"
-        export_to_midi(var['notes'], filename)
+        exports.append((var['notes'], filename, var['metadata']['method']))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda e: export_to_midi(e[0], e[1]), exports))
+
+    print()
+    for _, filename, method in exports:
         print(f"✓ {filename}")
-        print(f"   {var['metadata']['method']}")
+        if method:
+            print(f"   {method}")
 
     print("\n" + "=" * 60)
     print("Complete!")
@@ -1,7 +1,137 @@
+import functools
 from typing import List, Dict, Optional
 import numpy as np
+from numba import njit
 from scale_utils import get_scale_intervals
 
+# Cost sentinel for unreachable / out-of-band DTW cells. Costs are sums of
+# MIDI pitch distances (at most 127 * (n + m)), so int32 never overflows.
+_DTW_INF = np.iinfo(np.int32).max
+
+# Backpointer codes for the DTW predecessor of each cell
+_BP_DIAG = 0  # (i-1, j-1) match
+_BP_UP = 1    # (i-1, j)   insertion
+_BP_LEFT = 2  # (i, j-1)   deletion
+
+@njit(cache=True, nogil=True)
+def _dtw_fill(seq_a, seq_b, band):
+    """
+    Run the DTW forward pass for two int16 pitch sequences.
+
+    Only cells within a Sakoe-Chiba band of the (slanted) diagonal are
+    computed: row i covers columns i*m//n +/- band, everything else stays
+    at inf. Only two rows of the cost matrix are kept; each cell's
+    predecessor is recorded in a uint8 backpointer slab holding just the
+    band of each row, at column j - (center - band) (ties prefer diagonal,
+    then up, then left). Costs are int32, with _DTW_INF marking unreachable
+    cells.
+
+    Returns:
+        (backpointers, total_cost), backpointers shaped (n+1, 2*band+1)
+        for the effective (possibly widened) band
+    """
+    n, m = seq_a.shape[0], seq_b.shape[0]
+
+    # The band must be at least the per-row diagonal slope or it breaks into
+    # disconnected pieces; beyond m it already covers every column
+    band = min(max(band, (m + n - 1) // n), m)
+
+    bp = np.zeros((n + 1, 2 * band + 1), np.uint8)
+    prev = np.empty(m + 1, np.int32)
+    curr = np.empty(m + 1, np.int32)
+
+    prev[0] = 0
+    prev_lo, prev_hi = 0, 0
+
+    for i in range(1, n + 1):
+        a = seq_a[i - 1]
+        center = i * m // n
+        lo = max(1, center - band)
+        hi = min(m, center + band)
+        offset = center - band
+
+        for j in range(lo, hi + 1):
+            diag = prev[j - 1] if prev_lo <= j - 1 <= prev_hi else _DTW_INF
+            up = prev[j] if prev_lo <= j <= prev_hi else _DTW_INF
+            left = curr[j - 1] if j > lo else _DTW_INF
+            if diag <= up and diag <= left:
+                best = diag
+                bp[i, j - offset] = _BP_DIAG
+            elif up <= left:
+                best = up
+                bp[i, j - offset] = _BP_UP
+            else:
+                best = left
+                bp[i, j - offset] = _BP_LEFT
+            curr[j] = _DTW_INF if best == _DTW_INF else abs(a - seq_b[j - 1]) + best
+
+        prev, curr = curr, prev
+        prev_lo, prev_hi = lo, hi
+
+    return bp, prev[m]
+
+@njit(cache=True, nogil=True)
+def _dtw_backtrack(bp, m):
+    """
+    Walk the banded backpointer slab from (n, m) back to the origin.
+
+    Args:
+        bp: Backpointers from _dtw_fill
+        m: Length of seq_b
+
+    Returns:
+        (k, 2) int64 array of (index_a, index_b) pairs in forward order
+    """
+    n = bp.shape[0] - 1
+    band = (bp.shape[1] - 1) // 2
+    path = np.empty((n + m, 2), np.int64)
+    k = 0
+    i, j = n, m
+
+    while i > 0 and j > 0:
+        path[k, 0] = i - 1
+        path[k, 1] = j - 1
+        k += 1
+
+        move = bp[i, j - (i * m // n - band)]
+        if move == _BP_DIAG:
+            i -= 1
+            j -= 1
+        elif move == _BP_UP:
+            i -= 1
+        else:
+            j -= 1
+
+    return path[:k][::-1]
+
+@functools.lru_cache(maxsize=32)
+def _dtw_align_cached(seq_a: tuple, seq_b: tuple, band: int) -> tuple:
+    """
+    DTW alignment memoized on the two pitch sequences and band.
+
+    Alignment only depends on pitches (not scale or key), so the cache is
+    shared by every interpolator; repeated interpolations between the same
+    seeds skip the DP entirely.
+
+    Returns:
+        Tuple of (index_a, index_b) alignment pairs
+    """
+    # MIDI pitches fit int16 (same dtype as NoteArray.midi); the kernel
+    # accumulates costs in int32
+    a = np.asarray(seq_a, dtype=np.int16)
+    b = np.asarray(seq_b, dtype=np.int16)
+
+    # Identical sequences: the DP would only find the zero-cost diagonal, so
+    # skip it
+    if np.array_equal(a, b):
+        return tuple((i, i) for i in range(len(a)))
+
+    # Forward pass, then backtrack along the stored predecessors (both compiled)
+    bp, _ = _dtw_fill(a, b, band)
+    path = _dtw_backtrack(bp, len(b))
+
+    return tuple(map(tuple, path.tolist()))
+
 class MelodyInterpolator:
     """
     Interpolate between two melodies using DTW alignment and contour morphing.
@@ -13,8 +143,14 @@ class MelodyInterpolator:
         self.root_note = root_note
         self.scale_intervals = get_scale_intervals(scale_type)
 
+        # Distinct scale intervals in ascending order (fixed for the instance)
+        self._scale_degrees = np.array(sorted(set(self.scale_intervals)), dtype=np.int8)
+
+        # Snapped value for every MIDI note, so snapping is a table lookup
+        self._snap_lut = self._compute_snap(np.arange(128)).astype(np.int16)
+
     def dtw_interpolate(self, melody_a: List[Dict], melody_b: List[Dict],
-                       steps: int = 5) -> List[List[Dict]]:
+                       steps: int = 5, band: Optional[int] = None) -> List[List[Dict]]:
         """
         Interpolate between two melodies using Dynamic Time Warping alignment.
 
@@ -22,6 +158,8 @@ class MelodyInterpolator:
             melody_a: First melody (note dicts)
             melody_b: Second melody (note dicts)
             steps: Number of intermediate steps (excluding A and B)
+            band: Sakoe-Chiba band half-width in notes
+                  (default: max(4, shorter length // 4))
 
         Returns:
             List of interpolated melodies (including A and B)
@@ -34,7 +172,9 @@ class MelodyInterpolator:
         pitches_b = [n['midi'] for n in melody_b]
 
         # Compute DTW alignment
-        alignment = self._dtw_align(pitches_a, pitches_b)
+        if band is None:
+            band = max(4, min(len(pitches_a), len(pitches_b)) // 4)
+        alignment = self._dtw_align(pitches_a, pitches_b, band)
 
         # Generate interpolated sequences
         interpolated = []
@@ -42,11 +182,9 @@ class MelodyInterpolator:
         # Include original melody A
         interpolated.append(melody_a)
 
-        # Generate intermediate steps
-        for step in range(1, steps + 1):
-            t = step / (steps + 1)  # Interpolation factor (0 to 1)
-            interp_melody = self._interpolate_aligned(melody_a, melody_b, alignment, t)
-            interpolated.append(interp_melody)
+        # Generate all intermediate steps at once
+        t = np.arange(1, steps + 1) / (steps + 1)  # Interpolation factors (0 to 1)
+        interpolated.extend(self._interpolate_aligned(melody_a, melody_b, alignment, t))
 
         # Include original melody B
         interpolated.append(melody_b)
@@ -69,9 +207,14 @@ class MelodyInterpolator:
         if not melody_a or not melody_b:
             return []
 
+        pitches_a = np.fromiter((n['midi'] for n in melody_a), dtype=np.int64, count=len(melody_a))
+        pitches_b = np.fromiter((n['midi'] for n in melody_b), dtype=np.int64, count=len(melody_b))
+        range_a = (int(pitches_a.min()), int(pitches_a.max()))
+        range_b = (int(pitches_b.min()), int(pitches_b.max()))
+
         # Normalize contours to 0-1 range
-        contour_a = self._normalize_contour([n['midi'] for n in melody_a])
-        contour_b = self._normalize_contour([n['midi'] for n in melody_b])
+        contour_a = self._normalize_contour(pitches_a)
+        contour_b = self._normalize_contour(pitches_b)
 
         # Make contours same length (use longer length)
         max_len = max(len(contour_a), len(contour_b))
@@ -81,14 +224,13 @@ class MelodyInterpolator:
         interpolated = []
         interpolated.append(melody_a)
 
-        # Generate intermediate contours
-        for step in range(1, steps + 1):
-            t = step / (steps + 1)
-            interp_contour = [(1 - t) * a + t * b for a, b in zip(contour_a, contour_b)]
+        # Generate all intermediate contours at once: (steps, max_len)
+        t = np.arange(1, steps + 1) / (steps + 1)
+        interp_contours = (1 - t[:, None]) * contour_a + t[:, None] * contour_b
 
-            # Convert back to MIDI pitches with scale snapping
-            interp_melody = self._contour_to_melody(interp_contour, melody_a, melody_b, t)
-            interpolated.append(interp_melody)
+        # Convert back to MIDI pitches with scale snapping
+        interpolated.extend(self._contour_to_melody(interp_contours, melody_a, melody_b, t,
+                                                    range_a, range_b))
 
         interpolated.append(melody_b)
 
@@ -140,169 +282,159 @@ class MelodyInterpolator:
 
     # Helper methods
 
-    def _dtw_align(self, seq_a: List[int], seq_b: List[int]) -> List[tuple]:
+    def _dtw_align(self, seq_a, seq_b, band: Optional[int] = None) -> List[tuple]:
         """
         Compute DTW alignment between two sequences.
 
+        Args:
+            seq_a: First pitch sequence
+            seq_b: Second pitch sequence
+            band: Sakoe-Chiba band half-width (None = unconstrained)
+
         Returns:
             List of (index_a, index_b) alignment pairs
         """
-        n, m = len(seq_a), len(seq_b)
-
-        # Initialize cost matrix
-        cost = np.full((n + 1, m + 1), np.inf)
-        cost[0, 0] = 0
-
-        # Fill cost matrix
-        for i in range(1, n + 1):
-            for j in range(1, m + 1):
-                distance = abs(seq_a[i - 1] - seq_b[j - 1])
-                cost[i, j] = distance + min(cost[i - 1, j],    # insertion
-                                           cost[i, j - 1],    # deletion
-                                           cost[i - 1, j - 1]) # match
-
-        # Backtrack to find alignment
-        alignment = []
-        i, j = n, m
-
-        while i > 0 and j > 0:
-            alignment.append((i - 1, j - 1))
-
-            # Find minimum predecessor
-            candidates = [
-                (cost[i - 1, j - 1], (i - 1, j - 1)),
-                (cost[i - 1, j], (i - 1, j)),
-                (cost[i, j - 1], (i, j - 1))
-            ]
-            _, (i, j) = min(candidates)
-
-        alignment.reverse()
-        return alignment
+        if band is None:
+            band = max(len(seq_a), len(seq_b))
+
+        return list(_dtw_align_cached(tuple(int(p) for p in seq_a),
+                                      tuple(int(p) for p in seq_b), band))
 
     def _interpolate_aligned(self, melody_a: List[Dict], melody_b: List[Dict],
-                            alignment: List[tuple], t: float) -> List[Dict]:
+                            alignment: List[tuple], t: np.ndarray) -> List[List[Dict]]:
         """
-        Interpolate aligned melodies at factor t.
-        """
-        interp_melody = []
+        Interpolate aligned melodies at every factor in t.
 
-        for idx_a, idx_b in alignment:
-            note_a = melody_a[idx_a]
-            note_b = melody_b[idx_b]
+        Both melodies are packed into (4, n) arrays of midi/time/duration/velocity
+        once, and all steps are blended in a single broadcast.
 
-            # Interpolate pitch
-            pitch = int((1 - t) * note_a['midi'] + t * note_b['midi'])
+        Returns:
+            One melody per interpolation factor
+        """
+        fields_a = self._stack_fields(melody_a)
+        fields_b = self._stack_fields(melody_b)
 
-            # Snap to scale
-            pitch = self._snap_to_scale(pitch)
+        idx_a = np.fromiter((pair[0] for pair in alignment), dtype=np.intp, count=len(alignment))
+        idx_b = np.fromiter((pair[1] for pair in alignment), dtype=np.intp, count=len(alignment))
 
-            # Interpolate other properties
-            interp_note = {
-                'midi': pitch,
-                'time': (1 - t) * note_a['time'] + t * note_b['time'],
-                'duration': (1 - t) * note_a['duration'] + t * note_b['duration'],
-                'velocity': (1 - t) * note_a.get('velocity', 0.7) + t * note_b.get('velocity', 0.7)
-            }
+        # (steps, 4, len(alignment))
+        t = t[:, None, None]
+        blended = (1 - t) * fields_a[:, idx_a] + t * fields_b[:, idx_b]
+
+        # Interpolated pitch, truncated then snapped to scale
+        pitches = self._snap_array(blended[:, 0].astype(np.int64))
 
-            interp_melody.append(interp_note)
+        interpolated = []
+        for step_pitches, (_, times, durations, velocities) in zip(pitches.tolist(), blended.tolist()):
+            interpolated.append([
+                {'midi': p, 'time': tm, 'duration': d, 'velocity': v}
+                for p, tm, d, v in zip(step_pitches, times, durations, velocities)
+            ])
 
-        return interp_melody
+        return interpolated
 
-    def _normalize_contour(self, pitches: List[int]) -> List[float]:
+    def _stack_fields(self, melody: List[Dict]) -> np.ndarray:
+        """
+        Pack midi/time/duration/velocity into a (4, n) float64 array.
+        """
+        return np.array([
+            [n['midi'] for n in melody],
+            [n['time'] for n in melody],
+            [n['duration'] for n in melody],
+            [n.get('velocity', 0.7) for n in melody],
+        ], dtype=np.float64)
+
+    def _normalize_contour(self, pitches: List[int]) -> np.ndarray:
         """
         Normalize pitch sequence to 0-1 range.
         """
-        if not pitches:
-            return []
+        pitches = np.asarray(pitches, dtype=np.int64)
+        if pitches.size == 0:
+            return np.empty(0, dtype=np.float64)
 
-        min_pitch = min(pitches)
-        max_pitch = max(pitches)
+        min_pitch = pitches.min()
+        max_pitch = pitches.max()
 
         if max_pitch == min_pitch:
-            return [0.5] * len(pitches)
+            return np.full(pitches.size, 0.5)
 
-        return [(p - min_pitch) / (max_pitch - min_pitch) for p in pitches]
+        return (pitches - min_pitch) / (max_pitch - min_pitch)
 
-    def _resample_contour(self, contour: List[float], target_length: int) -> List[float]:
+    def _resample_contour(self, contour: np.ndarray, target_length: int) -> np.ndarray:
         """
         Resample contour to target length using linear interpolation.
         """
+        contour = np.asarray(contour, dtype=np.float64)
+
         if len(contour) == target_length:
             return contour
 
         if len(contour) == 0:
-            return [0.5] * target_length
+            return np.full(target_length, 0.5)
 
-        # Linear interpolation
+        # Linear interpolation between the neighbouring samples of each position
         indices = np.linspace(0, len(contour) - 1, target_length)
-        resampled = []
-
-        for idx in indices:
-            low = int(np.floor(idx))
-            high = min(int(np.ceil(idx)), len(contour) - 1)
-            frac = idx - low
-
-            if low == high:
-                resampled.append(contour[low])
-            else:
-                value = (1 - frac) * contour[low] + frac * contour[high]
-                resampled.append(value)
+        low = np.floor(indices).astype(np.intp)
+        high = np.minimum(np.ceil(indices).astype(np.intp), len(contour) - 1)
+        frac = indices - low
 
-        return resampled
+        blended = (1 - frac) * contour[low] + frac * contour[high]
+        return np.where(low == high, contour[low], blended)
 
-    def _contour_to_melody(self, contour: List[float], melody_a: List[Dict],
-                          melody_b: List[Dict], t: float) -> List[Dict]:
+    def _contour_to_melody(self, contours: np.ndarray, melody_a: List[Dict],
+                          melody_b: List[Dict], t: np.ndarray,
+                          range_a: tuple, range_b: tuple) -> List[List[Dict]]:
         """
-        Convert normalized contour back to melody with scale snapping.
+        Convert normalized contours (one row per factor in t) back to melodies
+        with scale snapping.
+
+        range_a / range_b are the (lowest, highest) MIDI pitches of A and B.
         """
         # Determine pitch range from interpolated A/B ranges
-        range_a = (min(n['midi'] for n in melody_a), max(n['midi'] for n in melody_a))
-        range_b = (min(n['midi'] for n in melody_b), max(n['midi'] for n in melody_b))
-
-        min_pitch = int((1 - t) * range_a[0] + t * range_b[0])
-        max_pitch = int((1 - t) * range_a[1] + t * range_b[1])
-
-        melody = []
-        for i, c in enumerate(contour):
-            # Map contour value to pitch range
-            pitch = int(min_pitch + c * (max_pitch - min_pitch))
-            pitch = self._snap_to_scale(pitch)
-
-            # Interpolate timing from A/B
-            idx_a = min(i, len(melody_a) - 1)
-            idx_b = min(i, len(melody_b) - 1)
-
-            note = {
-                'midi': pitch,
-                'time': (1 - t) * melody_a[idx_a]['time'] + t * melody_b[idx_b]['time'],
-                'duration': (1 - t) * melody_a[idx_a]['duration'] + t * melody_b[idx_b]['duration'],
-                'velocity': 0.7
-            }
-
-            melody.append(note)
-
-        return melody
+        min_pitch = ((1 - t) * range_a[0] + t * range_b[0]).astype(np.int64)
+        max_pitch = ((1 - t) * range_a[1] + t * range_b[1]).astype(np.int64)
+
+        # Map contour values to each step's pitch range
+        pitches = (min_pitch[:, None] + contours * (max_pitch - min_pitch)[:, None]).astype(np.int64)
+        pitches = self._snap_array(pitches)
+
+        # Interpolate timing from A/B (notes past the end of a melody reuse its last note)
+        length = contours.shape[1]
+        idx_a = np.minimum(np.arange(length), len(melody_a) - 1)
+        idx_b = np.minimum(np.arange(length), len(melody_b) - 1)
+        fields_a = self._stack_fields(melody_a)
+        fields_b = self._stack_fields(melody_b)
+
+        t = t[:, None]
+        times = (1 - t) * fields_a[1, idx_a] + t * fields_b[1, idx_b]
+        durations = (1 - t) * fields_a[2, idx_a] + t * fields_b[2, idx_b]
+
+        return [
+            [{'midi': p, 'time': tm, 'duration': d, 'velocity': 0.7}
+             for p, tm, d in zip(step_pitches, step_times, step_durations)]
+            for step_pitches, step_times, step_durations
+            in zip(pitches.tolist(), times.tolist(), durations.tolist())
+        ]
 
     def _extract_features(self, melody: List[Dict]) -> Dict:
         """
         Extract musical features from melody.
         """
-        pitches = [n['midi'] for n in melody]
+        pitches = np.fromiter((n['midi'] for n in melody), dtype=np.int64, count=len(melody))
 
         # Mean pitch
-        mean_pitch = np.mean(pitches)
+        mean_pitch = float(pitches.mean())
 
         # Pitch variance
-        pitch_variance = np.var(pitches)
+        pitch_variance = float(pitches.var())
 
         # Rhythm density (notes per second)
         total_duration = melody[-1]['time'] + melody[-1]['duration'] - melody[0]['time']
         rhythm_density = len(melody) / total_duration if total_duration > 0 else 0
 
         # Step/leap ratio
-        intervals = [abs(pitches[i] - pitches[i - 1]) for i in range(1, len(pitches))]
-        steps = sum(1 for i in intervals if i <= 2)
-        step_ratio = steps / len(intervals) if intervals else 0.5
+        intervals = np.abs(np.diff(pitches))
+        step_ratio = np.count_nonzero(intervals <= 2) / intervals.size if intervals.size else 0.5
 
         return {
             'mean_pitch': mean_pitch,
@@ -320,50 +452,65 @@ class MelodyInterpolator:
         """
         # Start with simple blend
         length = int((1 - t) * len(melody_a) + t * len(melody_b))
-        melody = []
+        len_a, len_b = len(melody_a), len(melody_b)
 
-        for i in range(length):
-            idx_a = min(int(i * len(melody_a) / length), len(melody_a) - 1)
-            idx_b = min(int(i * len(melody_b) / length), len(melody_b) - 1)
+        # Source note for each output position in A and B
+        positions = np.arange(length)
+        idx_a = np.minimum(positions * len_a // max(length, 1), len_a - 1)
+        idx_b = np.minimum(positions * len_b // max(length, 1), len_b - 1)
 
-            pitch = int((1 - t) * melody_a[idx_a]['midi'] + t * melody_b[idx_b]['midi'])
+        pitches_a = np.fromiter((n['midi'] for n in melody_a), dtype=np.int64, count=len_a)
+        pitches_b = np.fromiter((n['midi'] for n in melody_b), dtype=np.int64, count=len_b)
+        pitches = ((1 - t) * pitches_a[idx_a] + t * pitches_b[idx_b]).astype(np.int64)
 
-            # Adjust pitch toward target mean
-            current_mean = target_features['mean_pitch']
-            pitch = int(pitch + (current_mean - pitch) * 0.3)
+        # Adjust pitch toward target mean
+        current_mean = target_features['mean_pitch']
+        pitches = (pitches + (current_mean - pitches) * 0.3).astype(np.int64)
 
-            pitch = self._snap_to_scale(pitch)
+        pitches = self._snap_array(pitches)
 
-            note = {
+        rhythm_density = target_features['rhythm_density']
+        return [
+            {
                 'midi': pitch,
-                'time': i / target_features['rhythm_density'],
+                'time': i / rhythm_density,
                 'duration': 0.5,  # Simplified
                 'velocity': 0.7
             }
-
-            melody.append(note)
-
-        return melody
+            for i, pitch in enumerate(pitches.tolist())
+        ]
 
     def _snap_to_scale(self, midi_note: int) -> int:
         """
         Snap MIDI note to nearest note in the scale.
         """
-        note_class = midi_note % 12
-        octave = midi_note // 12
+        if 0 <= midi_note < 128:
+            return int(self._snap_lut[midi_note])
+        return int(self._compute_snap(np.array([midi_note]))[0])
+
+    def _snap_array(self, midi_notes: np.ndarray) -> np.ndarray:
+        """
+        Snap an array of MIDI notes (clipped to 0-127) to the scale.
+        """
+        return self._snap_lut[np.clip(midi_notes, 0, 127)]
 
-        # Find closest scale degree
-        scale_degrees = list(set(self.scale_intervals))
-        closest_degree = min(scale_degrees, key=lambda x: abs(x - note_class))
+    def _compute_snap(self, midi_notes: np.ndarray) -> np.ndarray:
+        """
+        Nearest scale note for each MIDI note (used to build the snap table).
+        """
+        note_class = midi_notes % 12
+        octave = midi_notes // 12
+
+        # Find closest scale degree (ties go to the lower degree)
+        distance = np.abs(self._scale_degrees[None, :].astype(np.int64) - note_class[:, None])
+        closest_degree = self._scale_degrees[np.argmin(distance, axis=1)]
 
         # Reconstruct MIDI note
         result = octave * 12 + closest_degree
 
         # Handle edge cases
-        if abs(result - midi_note) > 6:
-            if result < midi_note:
-                result += 12
-            else:
-                result -= 12
+        far = np.abs(result - midi_notes) > 6
+        shift = np.where(result < midi_notes, 12, -12)
+        result = np.where(far, result + shift, result)
 
         return result
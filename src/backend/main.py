@@ -1,26 +1,36 @@
-from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, File, Request, UploadFile, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Set
-from music21 import stream, note, tempo, meter, duration
-import json
-import tempfile
+import io
 import os
-import threading
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import asyncio
+import mido
+import orjson
+import numpy as np
+import uvicorn
+from anyio import to_thread
 from pythonosc import dispatcher, osc_server
 
 from transformations import MusicTransformer
-from variations import VariationGenerator
-from interpolate import MelodyInterpolator
-from constraints import MelodyValidator
+from midi_utils import midi_file_to_notes, notes_to_midi_file
+import workers
+from note_array import NoteArray
 from services import OSCService, LoopManager, EventBroadcaster
 
-app = FastAPI(title="MelodyGen API", version="1.0.0")
+logger = logging.getLogger(__name__)
 
-# Initialize services
-osc_service = OSCService()
+# orjson serializes the large nested note lists (interpolation, batch
+# variations) several times faster than the stdlib encoder
+app = FastAPI(title="MelodyGen API", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Initialize services (OSC_DEBUG=1/true/yes prints every payload sent to
+# SuperCollider; anything else, including 0/false, leaves it off)
+osc_service = OSCService(debug=os.environ.get("OSC_DEBUG", "").lower() in ("1", "true", "yes"))
 loop_manager = LoopManager()
 event_broadcaster = EventBroadcaster()
 
@@ -32,13 +42,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Process pool for the CPU-bound endpoints, created at startup
+cpu_executor = None
+
+# Writes service log records to stdout from a background thread, started at startup
+log_listener = None
+
+def _start_service_logging() -> QueueListener:
+    """
+    Route the services' (and this module's) log records through a queue, so
+    the OSC handler and broadcast paths only enqueue and the stdout write
+    happens on the listener's thread.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, handler)
+
+    for queued_logger in (logging.getLogger("services"), logger):
+        queued_logger.setLevel(logging.INFO)
+        queued_logger.addHandler(QueueHandler(log_queue))
+        queued_logger.propagate = False
+
+    listener.start()
+    return listener
+
 # Startup event to start background broadcaster
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on app startup."""
+    # CPU-bound endpoints share anyio's worker threads; raise the default cap
+    # of 40 so a burst of generate/interpolate requests doesn't queue
+    to_thread.current_default_thread_limiter().total_tokens = 100
+
+    # Variation/interpolation run in worker processes for real parallelism
+    # across concurrent requests (None on a single CPU)
+    global cpu_executor, log_listener
+    cpu_executor = workers.create_executor()
+    log_listener = _start_service_logging()
+
+    event_broadcaster.attach_loop(asyncio.get_running_loop())
     asyncio.create_task(event_broadcaster.broadcast_pending_events())
     print("📡 Started WebSocket broadcast task")
 
+    await start_osc_server()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the OSC listening socket and the worker processes."""
+    if osc_transport is not None:
+        osc_transport.close()
+    if cpu_executor is not None:
+        cpu_executor.shutdown(cancel_futures=True)
+    if log_listener is not None:
+        log_listener.stop()  # flushes queued records
+
+# Loop retriggers from completions handled in the same event-loop pass
+# (e.g. several layers ending on one bar) go out together as one bundle
+_pending_resends = []
+
+def _queue_resend(osc_address, packet):
+    """Queue a loop resend, flushing once the current loop pass is done."""
+    if not _pending_resends:
+        asyncio.get_running_loop().call_soon(_flush_resends)
+    _pending_resends.append((osc_address, packet))
+
+def _flush_resends():
+    items = _pending_resends[:]
+    _pending_resends.clear()
+    osc_service.send_many(items)
+
 # OSC message handler for melody completion
 def handle_melody_complete(address, *args):
     """
@@ -47,7 +120,7 @@ def handle_melody_complete(address, *args):
     Accepts variable arguments since SuperCollider may send additional data.
     """
     if len(args) == 0:
-        print(f"⚠️ Warning: No arguments received for {address}")
+        logger.warning("⚠️ Warning: No arguments received for %s", address)
         return
 
     # First argument should be targetGroup (track number)
@@ -56,33 +129,37 @@ def handle_melody_complete(address, *args):
     # Extract base OSC address: "/melody/complete" → "/melody", "/chord/complete" → "/chord"
     osc_address = address.replace("/complete", "")
 
-    print(f"✅ Completion: {address}, targetGroup: {target_group}")
+    logger.info("✅ Completion: %s, targetGroup: %s", address, target_group)
 
     # Check if this specific (targetGroup, oscAddress) combination is looping
-    loop_data = loop_manager.get_loop(target_group, osc_address)
-    if loop_data:
-        print(f"🔁 Re-triggering {osc_address} for targetGroup {target_group}")
-        osc_service.resend_message(osc_address, loop_data["payload"])
+    packet = loop_manager.get_loop(target_group, osc_address)
+    if packet is not None:
+        logger.info("🔁 Re-triggering %s for targetGroup %s", osc_address, target_group)
+        _queue_resend(osc_address, packet)
 
     # Store the completion event
     event_broadcaster.add_event(target_group)
 
 # Setup OSC server to receive messages from SuperCollider
-def start_osc_server():
-    """Start OSC server in background thread to listen for completion messages."""
+osc_transport = None
+
+async def start_osc_server():
+    """
+    Listen for completion messages on the app's event loop.
+
+    Datagrams are dispatched straight to handle_melody_complete on the loop,
+    with no server thread (or thread per datagram) in between.
+    """
+    global osc_transport
+
     disp = dispatcher.Dispatcher()
     disp.map("/melody/complete", handle_melody_complete)
     disp.map("/chord/complete", handle_melody_complete)  # Also handle chord completions
 
-    server = osc_server.ThreadingOSCUDPServer(("127.0.0.1", 7001), disp)
+    server = osc_server.AsyncIOOSCUDPServer(("127.0.0.1", 7001), disp, asyncio.get_running_loop())
+    osc_transport, _ = await server.create_serve_endpoint()
     print("🎧 OSC Server listening on 127.0.0.1:7001 for SuperCollider completion messages")
 
-    server.serve_forever()
-
-# Start OSC receiver in background thread
-osc_thread = threading.Thread(target=start_osc_server, daemon=True)
-osc_thread.start()
-
 # Pydantic models
 
 class NoteModel(BaseModel):
@@ -91,6 +168,28 @@ class NoteModel(BaseModel):
     duration: float
     velocity: float = 0.7
 
+def _to_dicts(notes: List[NoteModel]) -> List[Dict]:
+    """
+    Convert validated NoteModels to plain note dicts.
+
+    NoteModel only has flat primitive fields, so copying each instance's
+    __dict__ gives the same result as model_dump() at a fraction of the cost.
+    """
+    return [n.__dict__.copy() for n in notes]
+
+def _to_note_array(notes: List[NoteModel]) -> NoteArray:
+    """
+    Convert validated NoteModels straight to columns for array-based code,
+    without building the intermediate note dicts.
+    """
+    count = len(notes)
+    return NoteArray(
+        midi=np.fromiter((n.midi for n in notes), dtype=np.int16, count=count),
+        time=np.fromiter((n.time for n in notes), dtype=np.float64, count=count),
+        duration=np.fromiter((n.duration for n in notes), dtype=np.float64, count=count),
+        velocity=np.fromiter((n.velocity for n in notes), dtype=np.float64, count=count),
+    )
+
 class VariationRequest(BaseModel):
     notes: List[NoteModel]
     scale_type: str = "major"
@@ -107,6 +206,7 @@ class InterpolateRequest(BaseModel):
     root_note: str = "C"
     steps: int = 5
     method: str = "dtw"  # "dtw", "contour", or "feature"
+    band: Optional[int] = None  # DTW Sakoe-Chiba band in notes (None = auto)
 
 class ValidateRequest(BaseModel):
     notes: List[NoteModel]
@@ -129,15 +229,10 @@ class OSCMetadata(BaseModel):
     key: Optional[str] = None
     scale: Optional[str] = None
 
-class OSCMelodyRequest(BaseModel):
-    layer: int  # 1, 2, or 3
-    notes: List[Dict]  # Accept raw dicts from frontend
-    metadata: Dict  # Accept raw dict from frontend
-
 # Endpoints
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "MelodyGen API",
         "version": "1.0.0",
@@ -151,22 +246,30 @@ def read_root():
         }
     }
 
-@app.get("/osc/completions")
-def get_completion_events(since: Optional[float] = None):
+# Upper bound for long-polling /osc/completions, below common proxy idle timeouts
+MAX_POLL_WAIT = 25.0
+
+@app.get("/osc/completions", response_model=None)
+async def get_completion_events(since: Optional[float] = None, wait: float = 0):
     """
     Get melody completion events from SuperCollider.
 
     Query params:
     - since: timestamp (float) - only return events after this time
+    - wait: seconds (max 25) to hold the request open when there is nothing
+      newer than `since` (long polling); 0 answers immediately
 
     Returns:
     - events: list of completion events with layer and timestamp
     """
-    events = event_broadcaster.get_events(since)
-    return {
+    if since is not None and wait > 0:
+        events = await event_broadcaster.wait_for_events(since, min(wait, MAX_POLL_WAIT))
+    else:
+        events = event_broadcaster.get_events(since)
+    return ORJSONResponse({
         "success": True,
         "events": events
-    }
+    })
 
 @app.websocket("/ws/completions")
 async def websocket_completions(websocket: WebSocket):
@@ -180,105 +283,63 @@ async def websocket_completions(websocket: WebSocket):
     event_broadcaster.add_websocket(websocket)
 
     try:
-        # Keep connection alive and wait for client disconnect
-        while True:
-            # Just wait for messages (we don't expect any from client)
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+        # Keep connection alive until the client disconnects (we don't expect
+        # any messages from it; the iterator ends on disconnect)
+        async for _ in websocket.iter_text():
+            pass
+    finally:
         event_broadcaster.remove_websocket(websocket)
 
-@app.post("/variation/generate")
-def generate_variations(request: VariationRequest):
+# CPU-bound endpoints run their work off the event loop so it (WebSocket
+# broadcasts, other requests) stays responsive meanwhile; the in-memory
+# endpoints run directly on the loop. The JSON endpoints return an
+# ORJSONResponse (or worker-serialized bytes) themselves, which skips
+# FastAPI's jsonable_encoder walk over the (large) note lists
+
+async def _run_cpu_bound(worker_fn, payload: str) -> bytes:
+    """
+    Run a workers.*_worker function in the process pool, or in a worker
+    thread when there is no pool (single CPU).
+    """
+    if cpu_executor is not None:
+        return await asyncio.get_running_loop().run_in_executor(cpu_executor, worker_fn, payload)
+    return await to_thread.run_sync(worker_fn, payload)
+
+@app.post("/variation/generate", response_model=None)
+async def generate_variations(request: VariationRequest):
     """
     Generate multiple melodic variations from a seed melody.
 
     Returns variations with metadata and optional constraint filtering.
     """
-    try:
-        # Convert Pydantic models to dicts
-        seed_notes = [note.dict() for note in request.notes]
+    body = await _run_cpu_bound(workers.generate_worker, request.model_dump_json())
+    return Response(content=body, media_type="application/json")
 
-        # Create generator
-        generator = VariationGenerator(request.scale_type, request.root_note)
-
-        # Generate variations
-        variations = generator.generate_batch(
-            seed_notes,
-            count=request.count,
-            variation_types=request.variation_types
-        )
-
-        # Apply constraints if requested
-        if request.apply_constraints:
-            validator = MelodyValidator(request.scale_type, request.root_note)
-
-            reference_range = tuple(request.reference_range) if request.reference_range else None
-            variations = validator.filter_valid_variations(variations, reference_range)
-
-        # Calculate statistics
-        stats = generator.get_variation_statistics(variations)
-
-        return {
-            "success": True,
-            "variations": variations,
-            "statistics": stats,
-            "seed_info": {
-                "note_count": len(seed_notes),
-                "scale": request.scale_type,
-                "key": request.root_note
-            }
-        }
-
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-
-@app.post("/variation/interpolate")
-def interpolate_melodies(request: InterpolateRequest):
+@app.post("/variation/interpolate", response_model=None)
+async def interpolate_melodies(request: InterpolateRequest):
     """
     Interpolate between two melodies using DTW, contour, or feature-based methods.
 
     Returns a sequence of intermediate melodies.
     """
-    try:
-        # Convert to dicts
-        melody_a = [note.dict() for note in request.melody_a]
-        melody_b = [note.dict() for note in request.melody_b]
-
-        # Create interpolator
-        interpolator = MelodyInterpolator(request.scale_type, request.root_note)
-
-        # Perform interpolation
-        if request.method == "dtw":
-            interpolated = interpolator.dtw_interpolate(melody_a, melody_b, request.steps)
-        elif request.method == "contour":
-            interpolated = interpolator.contour_interpolate(melody_a, melody_b, request.steps)
-        elif request.method == "feature":
-            interpolated = interpolator.feature_interpolate(melody_a, melody_b, request.steps)
-        else:
-            return {"success": False, "error": f"Unknown interpolation method: {request.method}"}
-
-        return {
-            "success": True,
-            "interpolated_melodies": interpolated,
-            "method": request.method,
-            "steps": request.steps,
-            "total_melodies": len(interpolated)
-        }
-
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    body = await _run_cpu_bound(workers.interpolate_worker, request.model_dump_json())
+    return Response(content=body, media_type="application/json")
 
-@app.post("/variation/validate")
-def validate_melody(request: ValidateRequest):
+@app.post("/variation/validate", response_model=None)
+async def validate_melody(request: ValidateRequest):
     """
     Validate a melody against musical constraints.
 
     Checks: key membership, cadence, range, rhythm coherence.
     """
+    return ORJSONResponse(await to_thread.run_sync(_validate_melody, request))
+
+def _validate_melody(request: ValidateRequest) -> Dict:
     try:
-        notes = [note.dict() for note in request.notes]
+        # Validation is array-based end to end, so skip the note dicts
+        notes = _to_note_array(request.notes)
 
-        validator = MelodyValidator(request.scale_type, request.root_note)
+        validator = workers.get_validator(request.scale_type, request.root_note)
 
         reference_range = tuple(request.reference_range) if request.reference_range else None
 
@@ -299,33 +360,23 @@ def validate_melody(request: ValidateRequest):
         return {"success": False, "error": str(e)}
 
 @app.post("/variation/export-midi")
-def export_variation_to_midi(notes: List[NoteModel]):
+async def export_variation_to_midi(notes: List[NoteModel]):
     """
     Export a melody variation to MIDI file.
 
     Returns MIDI file as downloadable response.
     """
+    return await to_thread.run_sync(_export_variation_to_midi, notes)
+
+def _export_variation_to_midi(notes: List[NoteModel]):
     try:
-        # Create stream
-        s = stream.Stream()
-        s.append(tempo.TempoIndication(number=120))
-        s.append(meter.TimeSignature('4/4'))
-
-        # Add notes
-        for note_data in notes:
-            n = note.Note(note_data.midi)
-            n.duration = duration.Duration(quarterLength=note_data.duration * 2)
-            n.offset = note_data.time * 2
-            n.volume.velocity = int(note_data.velocity * 127)
-            s.insert(n.offset, n)
-
-        # Write to MIDI
-        with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-            s.write('midi', fp=tmp_file.name)
-            tmp_file.flush()
-            with open(tmp_file.name, 'rb') as f:
-                midi_bytes = f.read()
-            os.unlink(tmp_file.name)
+        # Build the file with mido directly (120 BPM, 4/4), no music21 stream
+        mid = notes_to_midi_file(_to_dicts(notes))
+
+        # Serialize to MIDI bytes in memory
+        buf = io.BytesIO()
+        mid.save(file=buf)
+        midi_bytes = buf.getvalue()
 
         return Response(
             content=midi_bytes,
@@ -347,115 +398,80 @@ async def import_midi_seed(file: UploadFile = File(...)):
         if not file.filename.endswith(('.mid', '.midi')):
             return {"success": False, "error": "Invalid file type. Please upload a MIDI file."}
 
-        import mido
-
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            tmp_path = tmp_file.name
-
-        try:
-            # Parse MIDI with mido
-            mid = mido.MidiFile(tmp_path)
-
-            # Get tempo
-            tempo_value = 500000  # Default 120 BPM
-            for msg in mid.tracks[0]:
-                if msg.type == 'set_tempo':
-                    tempo_value = msg.tempo
-                    break
-
-            # Extract notes from first track with notes
-            notes = []
-            for track in mid.tracks:
-                active_notes = {}
-                current_time = 0
-
-                for msg in track:
-                    current_time += msg.time
-
-                    if msg.type == 'note_on' and msg.velocity > 0:
-                        active_notes[msg.note] = (current_time, msg.velocity)
-                    elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                        if msg.note in active_notes:
-                            start_time, velocity = active_notes[msg.note]
-                            duration_ticks = current_time - start_time
-
-                            time_seconds = mido.tick2second(start_time, mid.ticks_per_beat, tempo_value)
-                            duration_seconds = mido.tick2second(duration_ticks, mid.ticks_per_beat, tempo_value)
-
-                            notes.append({
-                                'midi': msg.note,
-                                'time': time_seconds,
-                                'duration': duration_seconds,
-                                'velocity': velocity / 127.0
-                            })
-                            del active_notes[msg.note]
-
-                if notes:  # Use first track with notes
-                    break
-
-            os.unlink(tmp_path)
-
-            notes.sort(key=lambda n: n['time'])
-
-            return {
-                "success": True,
-                "notes": notes,
-                "note_count": len(notes),
-                "filename": file.filename
-            }
-
-        except Exception as e:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-            raise e
+        # Parse in a worker thread so large files don't stall the event loop.
+        # mido reads the upload's own spooled file (in memory unless large),
+        # so the bytes aren't copied into another buffer first
+        await file.seek(0)
+        notes = await to_thread.run_sync(_parse_midi_upload, file.file)
+
+        return {
+            "success": True,
+            "notes": notes,
+            "note_count": len(notes),
+            "filename": file.filename
+        }
 
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _parse_midi_upload(fileobj) -> List[Dict]:
+    # Parse MIDI with mido straight from the uploaded file object, then
+    # extract notes from the first track with notes (sorted by start time)
+    mid = mido.MidiFile(file=fileobj)
+    return midi_file_to_notes(mid)
+
 @app.post("/osc/send-melody")
-def send_melody_to_supercollider(request: OSCMelodyRequest):
+async def send_melody_to_supercollider(request: Request):
     """
     Send melody to SuperCollider via OSC.
 
     Routes to /chord if chordMode is true, otherwise /melody.
-    Format: {notes: [{midi, vel, dur}, ...], metadata: {..., targetGroup: 0}}
+    Format: {layer: 1, notes: [{midi, vel, dur}, ...], metadata: {..., targetGroup: 0}}
+
+    The notes and metadata are forwarded to SuperCollider untouched, so the
+    body is read as plain JSON instead of being copied into a Pydantic model.
     """
     try:
+        payload = orjson.loads(await request.body())
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        layer = payload["layer"]  # 1, 2, or 3
+        notes = payload["notes"]
+        metadata = payload["metadata"]
+        # Same types OSCMelodyRequest enforced (bool is not accepted as a layer)
+        if not isinstance(layer, int) or isinstance(layer, bool):
+            raise ValueError("layer must be an integer")
+        if not isinstance(notes, list):
+            raise ValueError("notes must be a list")
+        if not isinstance(metadata, dict):
+            raise ValueError("metadata must be an object")
+
         # Send the melody via OSC service
-        result = osc_service.send_melody(request.notes, request.metadata)
-
-        # Handle looping
-        is_loop = request.metadata.get("loop", False)
-        target_group = request.metadata.get("targetGroup", 0)
-        is_chord_mode = request.metadata.get("chordMode", False)
-        osc_address = "/chord" if is_chord_mode else "/melody"
-
-        if is_loop:
-            # Store for re-triggering when completion received
-            osc_payload = {
-                "notes": request.notes,
-                "metadata": request.metadata
-            }
-            json_payload = json.dumps(osc_payload)
-            loop_manager.add_loop(target_group, osc_address, json_payload)
+        result, packet = osc_service.send_melody(notes, metadata)
+
+        # Handle looping (the service already resolved address and targetGroup)
+        target_group = result["targetGroup"]
+        osc_address = result["address"]
+
+        if metadata.get("loop", False):
+            # Store the encoded message for re-triggering when completion received
+            loop_manager.add_loop(target_group, osc_address, packet)
         else:
             # Remove from looping if it was previously looping (for this specific address)
             loop_manager.remove_loop(target_group, osc_address)
 
         return {
             **result,
-            "layer": request.layer  # Keep for backward compatibility
+            "layer": layer  # Keep for backward compatibility
         }
 
+    except KeyError as e:
+        return {"success": False, "error": f"Missing field: {e.args[0]}"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.post("/osc/stop-track")
-def stop_track(target_group: int):
+async def stop_track(target_group: int):
     """
     Stop looping for a specific track.
 
@@ -481,7 +497,7 @@ def stop_track(target_group: int):
         return {"success": False, "error": str(e)}
 
 @app.post("/osc/stop-all")
-def stop_all_tracks():
+async def stop_all_tracks():
     """
     Stop all looping tracks.
 
@@ -502,5 +518,8 @@ def stop_all_tracks():
         return {"success": False, "error": str(e)}
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard]).
+    # Stays at a single worker: the OSC receiver binds port 7001 and the
+    # loop/event state lives in this process, so extra workers would neither
+    # start their OSC server nor see each other's loops and completions.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto", workers=1)
@@ -0,0 +1,151 @@
+import mido
+import numpy as np
+from typing import List, Dict, Optional
+from note_array import NoteArray
+
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 BPM)
+DEFAULT_TICKS_PER_BEAT = 480
+
+def notes_to_midi_file(notes: List[Dict], tempo: int = DEFAULT_TEMPO,
+                       ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT) -> mido.MidiFile:
+    """
+    Build a single-track MIDI file from note dicts using mido directly.
+
+    Args:
+        notes: List of note dicts with midi, time, duration (seconds) and velocity (0-1)
+        tempo: Tempo in microseconds per beat
+        ticks_per_beat: MIDI file resolution
+
+    Returns:
+        mido.MidiFile ready to save
+    """
+    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+
+    track.append(mido.MetaMessage('set_tempo', tempo=tempo))
+    track.append(mido.MetaMessage('time_signature', numerator=4, denominator=4))
+
+    ticks_per_second = ticks_per_beat * 1e6 / tempo
+
+    # (absolute tick, order, type, note, velocity); note-offs sort before
+    # note-ons on the same tick so repeated pitches retrigger cleanly
+    events = []
+    for note_data in notes:
+        start = round(note_data['time'] * ticks_per_second)
+        end = round((note_data['time'] + note_data['duration']) * ticks_per_second)
+        velocity = int(note_data.get('velocity', 0.7) * 127)
+        events.append((start, 1, 'note_on', note_data['midi'], velocity))
+        events.append((end, 0, 'note_off', note_data['midi'], 0))
+
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    current_tick = 0
+    for tick, _, msg_type, midi_note, velocity in events:
+        track.append(mido.Message(msg_type, note=midi_note, velocity=velocity,
+                                  time=tick - current_tick))
+        current_tick = tick
+
+    return mid
+
+def write_midi_file(notes: List[Dict], filepath: str, tempo: int = DEFAULT_TEMPO,
+                    ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT) -> None:
+    """
+    Write note dicts to a MIDI file on disk.
+
+    Args:
+        notes: List of note dicts with midi, time, duration (seconds) and velocity (0-1)
+        filepath: Output .mid path
+        tempo: Tempo in microseconds per beat
+        ticks_per_beat: MIDI file resolution
+    """
+    notes_to_midi_file(notes, tempo, ticks_per_beat).save(filepath)
+
+def get_midi_tempo(mid: mido.MidiFile) -> int:
+    """
+    Get the first tempo (microseconds per beat) from the first track, or 120 BPM.
+    """
+    for msg in mid.tracks[0]:
+        if msg.type == 'set_tempo':
+            return msg.tempo
+    return DEFAULT_TEMPO
+
+def midi_file_to_note_array(mid: mido.MidiFile, tempo: Optional[int] = None) -> NoteArray:
+    """
+    Extract notes from the first track of a MIDI file that contains notes.
+
+    Absolute tick times come from one cumulative sum per track, note-ons are
+    paired with note-offs by grouping the note events per pitch, and
+    conversion to seconds is done afterwards as a single vectorized multiply.
+
+    Args:
+        mid: Parsed MIDI file
+        tempo: Tempo in microseconds per beat (default: first tempo in the file)
+
+    Returns:
+        NoteArray with times/durations in seconds and velocities in 0-1,
+        sorted by start time
+    """
+    if tempo is None:
+        tempo = get_midi_tempo(mid)
+
+    empty = np.zeros(0, dtype=np.int64)
+    midis, start_ticks, duration_ticks, velocities = empty, empty, empty, empty
+
+    for track in mid.tracks:
+        abs_ticks = np.cumsum(np.fromiter((msg.time for msg in track), dtype=np.int64,
+                                          count=len(track)))
+
+        # (message index, is_on, note, velocity) for every note message
+        events = np.array([
+            (i, msg.velocity > 0 if msg.type == 'note_on' else False, msg.note, msg.velocity)
+            for i, msg in enumerate(track)
+            if msg.type == 'note_on' or msg.type == 'note_off'
+        ], dtype=np.int64).reshape(-1, 4)
+        index, is_on, note, velocity = events.T
+
+        # Group events by pitch (keeping track order): a note-off closes a note
+        # only when the previous event on that pitch was a note-on, which is
+        # the most recent start for the pitch
+        by_pitch = np.argsort(note, kind='stable')
+        prev, curr = by_pitch[:-1], by_pitch[1:]
+        closes = ((note[prev] == note[curr]) & (is_on[prev] == 1) & (is_on[curr] == 0))
+        starts, ends = prev[closes], curr[closes]
+
+        # Emit notes in note-off order, as the sequential scan did
+        order = np.argsort(ends, kind='stable')
+        starts, ends = starts[order], ends[order]
+
+        midis = note[ends]
+        start_ticks = abs_ticks[index[starts]]
+        duration_ticks = abs_ticks[index[ends]] - start_ticks
+        velocities = velocity[starts]
+
+        if len(midis):  # Use first track with notes
+            break
+
+    # Same arithmetic as mido.tick2second, applied to every note at once
+    seconds_per_tick = tempo * 1e-6 / mid.ticks_per_beat
+    times = np.asarray(start_ticks, dtype=np.float64) * seconds_per_tick
+    order = np.argsort(times, kind='stable')
+
+    return NoteArray(
+        midi=np.asarray(midis, dtype=np.int16)[order],
+        time=times[order],
+        duration=(np.asarray(duration_ticks, dtype=np.float64) * seconds_per_tick)[order],
+        velocity=(np.asarray(velocities, dtype=np.float64) / 127.0)[order],
+    )
+
+def midi_file_to_notes(mid: mido.MidiFile, tempo: Optional[int] = None) -> List[Dict]:
+    """
+    Extract note dicts from the first track of a MIDI file that contains notes.
+
+    Args:
+        mid: Parsed MIDI file
+        tempo: Tempo in microseconds per beat (default: first tempo in the file)
+
+    Returns:
+        List of note dicts with midi, time, duration (seconds) and velocity (0-1),
+        sorted by start time
+    """
+    return midi_file_to_note_array(mid, tempo).to_dicts()
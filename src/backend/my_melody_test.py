@@ -5,7 +5,7 @@ Create and test your own custom melody.
 
 from variations import VariationGenerator
 from constraints import MelodyValidator
-from music21 import stream, note, tempo, meter, duration
+from midi_utils import write_midi_file
 import os
 
 # ============================================================
@@ -97,35 +97,13 @@ print("=" * 60)
 os.makedirs('output', exist_ok=True)
 
 # Export original seed
-s = stream.Stream()
-s.append(tempo.TempoIndication(number=120))
-s.append(meter.TimeSignature('4/4'))
-
-for note_data in seed:
-    n = note.Note(note_data['midi'])
-    n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
-    n.offset = note_data['time'] * 2
-    n.volume.velocity = int(note_data.get('velocity', 0.7) * 127)
-    s.insert(n.offset, n)
-
-s.write('midi', fp='output/seed_melody.mid')
+write_midi_file(seed, 'output/seed_melody.mid')
 print("\n✓ Exported: output/seed_melody.mid (original)")
 
 # Export valid variations
 for i, var in enumerate(valid_variations[:5], 1):  # Top 5 only
-    s = stream.Stream()
-    s.append(tempo.TempoIndication(number=120))
-    s.append(meter.TimeSignature('4/4'))
-
-    for note_data in var['notes']:
-        n = note.Note(note_data['midi'])
-        n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
-        n.offset = note_data['time'] * 2
-        n.volume.velocity = int(note_data.get('velocity', 0.7) * 127)
-        s.insert(n.offset, n)
-
     filename = f"output/variation_{i:02d}.mid"
-    s.write('midi', fp=filename)
+    write_midi_file(var['notes'], filename)
     print(f"✓ Exported: {filename} - {var['metadata']['method']}")
 
 print("\n" + "=" * 60)
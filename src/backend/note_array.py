@@ -0,0 +1,50 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Dict
+
+@dataclass
+class NoteArray:
+    """
+    Structure-of-arrays melody: one NumPy array per note field.
+
+    Used where notes are processed in bulk (validation, MIDI import) instead of
+    a list of {midi, time, duration, velocity} dicts. Convert at the edges with
+    from_dicts / to_dicts.
+    """
+    midi: np.ndarray      # int16 MIDI note numbers
+    time: np.ndarray      # float64 start times (seconds)
+    duration: np.ndarray  # float64 durations (seconds)
+    velocity: np.ndarray  # float64 velocities (0-1)
+
+    def __len__(self) -> int:
+        return len(self.midi)
+
+    def __getitem__(self, index) -> 'NoteArray':
+        """Slice all fields together (e.g. notes[-4:])."""
+        if not isinstance(index, slice):
+            raise TypeError("NoteArray only supports slicing; use to_dicts() for single notes")
+        return NoteArray(self.midi[index], self.time[index],
+                         self.duration[index], self.velocity[index])
+
+    @classmethod
+    def from_dicts(cls, notes: List[Dict]) -> 'NoteArray':
+        """
+        Build from note dicts (velocity defaults to 0.7 when missing).
+        """
+        count = len(notes)
+        return cls(
+            midi=np.fromiter((n['midi'] for n in notes), dtype=np.int16, count=count),
+            time=np.fromiter((n['time'] for n in notes), dtype=np.float64, count=count),
+            duration=np.fromiter((n['duration'] for n in notes), dtype=np.float64, count=count),
+            velocity=np.fromiter((n.get('velocity', 0.7) for n in notes), dtype=np.float64, count=count),
+        )
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Convert back to note dicts with plain Python numbers.
+        """
+        return [
+            {'midi': m, 'time': t, 'duration': d, 'velocity': v}
+            for m, t, d, v in zip(self.midi.tolist(), self.time.tolist(),
+                                  self.duration.tolist(), self.velocity.tolist())
+        ]
@@ -5,9 +5,11 @@ Process JSON melodies from ototope-i.json and generate variations.
 
 import json
 import os
+import random
+from concurrent.futures import ProcessPoolExecutor
 from variations import VariationGenerator
 from constraints import MelodyValidator
-from music21 import stream, note, tempo, meter, duration
+from midi_utils import write_midi_file
 
 def convert_json_to_notes(layer_data):
     """
@@ -59,18 +61,73 @@ def convert_json_to_notes(layer_data):
 
 def export_to_midi(notes, filepath):
     """Export notes to MIDI file"""
-    s = stream.Stream()
-    s.append(tempo.TempoIndication(number=120))
-    s.append(meter.TimeSignature('4/4'))
+    write_midi_file(notes, filepath)
 
-    for note_data in notes:
-        n = note.Note(note_data['midi'])
-        n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
-        n.offset = note_data['time'] * 2
-        n.volume.velocity = int(note_data.get('velocity', 0.7) * 127)
-        s.insert(n.offset, n)
+def process_melody(melody_name, melody_data):
+    """
+    Generate, validate and export variations for one melody.
+
+    Runs in a worker process, so progress lines are collected and returned
+    for the parent to print in order instead of interleaving.
 
-    s.write('midi', fp=filepath)
+    Returns:
+        The progress log for this melody
+    """
+    output = []
+    log = output.append
+
+    log(f"\n{'=' * 60}")
+    log(f"Processing: {melody_name}")
+    log('=' * 60)
+
+    # Get first layer (assuming layer1 exists)
+    if 'layer1' not in melody_data['layers']:
+        log(f"  Skipping {melody_name} - no layer1 found")
+        return "\n".join(output)
+
+    layer1 = melody_data['layers']['layer1']
+
+    # Convert to our format
+    notes, key, scale = convert_json_to_notes(layer1)
+
+    log(f"  Notes: {len(notes)}")
+    log(f"  Key: {key} {scale}")
+    log(f"  First note: MIDI {notes[0]['midi']}")
+    log(f"  Last note: MIDI {notes[-1]['midi']}")
+
+    # Generate variations
+    log(f"\n  Generating variations...")
+    generator = VariationGenerator(scale, key)
+    variations = generator.generate_batch(notes, count=20)
+    log(f"  Generated: {len(variations)} variations")
+
+    # Validate
+    log(f"  Validating...")
+    validator = MelodyValidator(scale, key)
+    valid = validator.filter_valid_variations(variations)
+    log(f"  Valid: {len(valid)}/{len(variations)}")
+
+    if not valid:
+        log(f"  ⚠️  No valid variations for {melody_name}")
+        log(f"  Exporting all variations anyway...")
+        valid = variations[:10]  # Take first 10
+
+    # Export
+    melody_folder = f"output/{melody_name}"
+    os.makedirs(melody_folder, exist_ok=True)
+
+    # Export original
+    export_to_midi(notes, f"{melody_folder}/00_original.mid")
+    log(f"\n  ✓ {melody_folder}/00_original.mid")
+
+    # Export variations
+    for i, var in enumerate(valid[:10], 1):
+        filename = f"{melody_folder}/{i:02d}_{var['metadata']['variation_type']}.mid"
+        export_to_midi(var['notes'], filename)
+        log(f"  ✓ {filename}")
+        log(f"     {var['metadata']['method']}")
+
+    return "\n".join(output)
 
 def main():
     # Load JSON file
@@ -96,57 +153,12 @@ def main():
     # Process each melody
     os.makedirs('output', exist_ok=True)
 
-    for melody_name, melody_data in melodies.items():
-        print(f"\n{'=' * 60}")
-        print(f"Processing: {melody_name}")
-        print('=' * 60)
-
-        # Get first layer (assuming layer1 exists)
-        if 'layer1' not in melody_data['layers']:
-            print(f"  Skipping {melody_name} - no layer1 found")
-            continue
-
-        layer1 = melody_data['layers']['layer1']
-
-        # Convert to our format
-        notes, key, scale = convert_json_to_notes(layer1)
-
-        print(f"  Notes: {len(notes)}")
-        print(f"  Key: {key} {scale}")
-        print(f"  First note: MIDI {notes[0]['midi']}")
-        print(f"  Last note: MIDI {notes[-1]['midi']}")
-
-        # Generate variations
-        print(f"\n  Generating variations...")
-        generator = VariationGenerator(scale, key)
-        variations = generator.generate_batch(notes, count=20)
-        print(f"  Generated: {len(variations)} variations")
-
-        # Validate
-        print(f"  Validating...")
-        validator = MelodyValidator(scale, key)
-        valid = validator.filter_valid_variations(variations)
-        print(f"  Valid: {len(valid)}/{len(variations)}")
-
-        if not valid:
-            print(f"  ⚠️  No valid variations for {melody_name}")
-            print(f"  Exporting all variations anyway...")
-            valid = variations[:10]  # Take first 10
-
-        # Export
-        melody_folder = f"output/{melody_name}"
-        os.makedirs(melody_folder, exist_ok=True)
-
-        # Export original
-        export_to_midi(notes, f"{melody_folder}/00_original.mid")
-        print(f"\n  ✓ {melody_folder}/00_original.mid")
-
-        # Export variations
-        for i, var in enumerate(valid[:10], 1):
-            filename = f"{melody_folder}/{i:02d}_{var['metadata']['variation_type']}.mid"
-            export_to_midi(var['notes'], filename)
-            print(f"  ✓ {filename}")
-            print(f"     {var['metadata']['method']}")
+    # Melodies are independent (separate output folders), so process them
+    # in parallel; random.seed reseeds each worker so forked processes don't
+    # share the parent's random state
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=random.seed) as executor:
+        for melody_log in executor.map(process_melody, melodies.keys(), melodies.values()):
+            print(melody_log)
 
     print("\n" + "=" * 60)
     print("Complete!")
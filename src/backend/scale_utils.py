@@ -1,5 +1,7 @@
-from music21 import scale, pitch, note
-from typing import List, Dict, Optional
+import functools
+import numpy as np
+from music21 import scale, pitch
+from typing import List, Dict, Optional, Tuple
 
 def alter_scale_degrees(base_scale, alterations: Dict[int, int]):
     """
@@ -27,35 +29,43 @@ def alter_scale_degrees(base_scale, alterations: Dict[int, int]):
     
     return scale.ConcreteScale(pitches=new_pitches)
 
-def get_scale_intervals(scale_type: str) -> List[int]:
+# Semitone intervals from the root; built once at import (tuples, so callers
+# can't mutate the shared table)
+_SCALE_INTERVALS: Dict[str, Tuple[int, ...]] = {
+    "major": (0, 2, 4, 5, 7, 9, 11),
+    "minor": (0, 2, 3, 5, 7, 8, 10),
+    "harmonic minor": (0, 2, 3, 5, 7, 8, 11),
+    "melodic minor": (0, 2, 3, 5, 7, 9, 11),
+    "pentatonic": (0, 2, 4, 7, 9),
+    "minor pentatonic": (0, 3, 5, 7, 10),
+    "blues": (0, 3, 5, 6, 7, 10),
+    "chromatic": (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11),
+    "whole tone": (0, 2, 4, 6, 8, 10),
+    "dorian": (0, 2, 3, 5, 7, 9, 10),
+    "phrygian": (0, 1, 3, 5, 7, 8, 10),
+    "lydian": (0, 2, 4, 6, 7, 9, 11),
+    "mixolydian": (0, 2, 4, 5, 7, 9, 10),
+    "aeolian": (0, 2, 3, 5, 7, 8, 10),
+    "locrian": (0, 1, 3, 5, 6, 8, 10),
+    # Custom scales
+    "phrygian dominant": (0, 1, 4, 5, 7, 8, 10)  # Phrygian with raised 3rd
+}
+
+# Pitch-class names as music21 spells them for a bare MIDI number
+_NOTE_NAMES = ("C", "C#", "D", "E-", "E", "F", "F#", "G", "G#", "A", "B-", "B")
+
+def get_scale_intervals(scale_type: str) -> Tuple[int, ...]:
     """
     Get the semitone intervals for a given scale type.
     Includes standard scales and custom scales like Phrygian Dominant.
     
     Returns:
-        List of semitone intervals from root
+        Tuple of semitone intervals from root
     """
-    standard_scales = {
-        "major": [0, 2, 4, 5, 7, 9, 11],
-        "minor": [0, 2, 3, 5, 7, 8, 10],
-        "harmonic minor": [0, 2, 3, 5, 7, 8, 11],
-        "melodic minor": [0, 2, 3, 5, 7, 9, 11],
-        "pentatonic": [0, 2, 4, 7, 9],
-        "minor pentatonic": [0, 3, 5, 7, 10],
-        "blues": [0, 3, 5, 6, 7, 10],
-        "chromatic": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
-        "whole tone": [0, 2, 4, 6, 8, 10],
-        "dorian": [0, 2, 3, 5, 7, 9, 10],
-        "phrygian": [0, 1, 3, 5, 7, 8, 10],
-        "lydian": [0, 2, 4, 6, 7, 9, 11],
-        "mixolydian": [0, 2, 4, 5, 7, 9, 10],
-        "aeolian": [0, 2, 3, 5, 7, 8, 10],
-        "locrian": [0, 1, 3, 5, 6, 8, 10],
-        # Custom scales
-        "phrygian dominant": [0, 1, 4, 5, 7, 8, 10]  # Phrygian with raised 3rd
-    }
-    
-    return standard_scales.get(scale_type, standard_scales["major"])
+    return _SCALE_INTERVALS.get(scale_type, _SCALE_INTERVALS["major"])
+
+# Phrygian degrees as named intervals, so pitches keep their scale spelling
+_PHRYGIAN_STEPS = ("P1", "m2", "m3", "P4", "P5", "m6", "m7")
 
 def create_custom_scale(root_note: str, octave: int, scale_type: str) -> Optional[scale.ConcreteScale]:
     """
@@ -70,14 +80,34 @@ def create_custom_scale(root_note: str, octave: int, scale_type: str) -> Optiona
         scale.ConcreteScale object or None if creation fails
     """
     if scale_type == "phrygian dominant":
-        # Create Phrygian Dominant by altering Phrygian scale
-        base_scale = scale.PhrygianScale(f'{root_note}{octave}')
-        # Raise the 3rd degree by 1 semitone
-        return alter_scale_degrees(base_scale, {3: 1})
+        # Phrygian spelled straight from the tonic (no music21 scale object
+        # or getPitches walk), with the 3rd raised by 1 semitone
+        tonic = pitch.Pitch(f'{root_note}{octave}')
+        pitches = [tonic.transpose(step) for step in _PHRYGIAN_STEPS]
+        pitches[2] = pitches[2].transpose(1)
+        return scale.ConcreteScale(pitches=pitches)
     
     # For other custom scales, we can add more cases here
     return None
 
+@functools.lru_cache(maxsize=256)
+def _scale_notes(root_note: str, octave: int, scale_type: str, num_notes: int) -> Tuple[Tuple[int, str], ...]:
+    """(midi, pitch_name) pairs for generate_scale_notes, cached per arguments."""
+    intervals = get_scale_intervals(scale_type)
+    
+    # Convert root note to MIDI number (the only music21 object built)
+    root_midi = pitch.Pitch(f"{root_note}{octave}").midi
+    
+    # Whole MIDI vector at once: degree i wraps into the next octave every
+    # len(intervals) notes
+    intervals_arr = np.asarray(intervals, dtype=np.int16)
+    i = np.arange(num_notes, dtype=np.int32)
+    midi_notes = (root_midi + intervals_arr[i % intervals_arr.size]
+                  + (i // intervals_arr.size) * 12).tolist()
+    
+    return tuple((midi_note, f"{_NOTE_NAMES[midi_note % 12]}{midi_note // 12 - 1}")
+                 for midi_note in midi_notes)
+
 def generate_scale_notes(root_note: str, octave: int, scale_type: str, num_notes: int = 8) -> List[Dict[str, any]]:
     """
     Generate notes for a given scale, supporting both standard and custom scales.
@@ -85,23 +115,5 @@ def generate_scale_notes(root_note: str, octave: int, scale_type: str, num_notes
     Returns:
         List of dicts with 'midi' and 'pitch_name' for each note
     """
-    intervals = get_scale_intervals(scale_type)
-    
-    # Convert root note to MIDI number
-    root_note_obj = note.Note(f"{root_note}{octave}")
-    root_midi = root_note_obj.pitch.midi
-    
-    notes = []
-    for i in range(num_notes):
-        scale_degree = i % len(intervals)
-        octave_offset = i // len(intervals)
-        
-        midi_note = root_midi + intervals[scale_degree] + (octave_offset * 12)
-        note_obj = note.Note(midi=midi_note)
-        
-        notes.append({
-            'midi': midi_note,
-            'pitch_name': note_obj.nameWithOctave
-        })
-    
-    return notes
\ No newline at end of file
+    return [{'midi': midi_note, 'pitch_name': pitch_name}
+            for midi_note, pitch_name in _scale_notes(root_note, octave, scale_type, num_notes)]
@@ -1,22 +1,77 @@
 import asyncio
+import bisect
+import contextlib
+import logging
 import threading
 import time
-from typing import Dict, List, Set
+from collections import deque
+from itertools import islice
+import orjson
+from typing import Dict, List, Optional, Tuple
 from fastapi import WebSocket
 
 
+logger = logging.getLogger(__name__)
+
+
 class EventBroadcaster:
     """
     Thread-safe broadcaster for completion events via WebSocket.
     Manages event history and active WebSocket connections.
+
+    The history ring is the only copy of each event: the broadcast task keeps
+    a sequence cursor into it and sends whatever was appended since its last
+    send. add_event may be called from any thread; it wakes the task through
+    an asyncio.Event (via call_soon_threadsafe) instead of the task polling.
+
+    Each client has its own bounded frame queue drained by a writer task, so
+    a slow client only backs up its own queue. A client max_queued frames
+    behind loses its oldest frame rather than its connection; one that can't
+    take a frame within send_timeout (or errors) is dropped.
     """
 
-    def __init__(self, max_history: int = 100):
+    def __init__(self, max_history: int = 100, send_timeout: float = 1.0,
+                 coalesce_window: float = 0.001, max_queued: int = 256):
         self.max_history = max_history
-        self._completion_events: List[Dict] = []
-        self._active_websockets: Set[WebSocket] = set()
-        self._pending_events: List[Dict] = []
+        # Completions that SuperCollider sends together (layers ending on the
+        # same bar) arrive as separate datagrams; after a lone event, wait
+        # this many seconds so the rest of the burst shares its frame
+        self.coalesce_window = coalesce_window
+        # A client that can't take a frame within this many seconds is
+        # dropped, so one stuck socket can't stall the broadcast for everyone
+        self.send_timeout = send_timeout
+        # Frames a client may fall behind before its oldest are discarded
+        # (bounds the memory a slow client can hold)
+        self.max_queued = max_queued
+        # Bounded history ring plus its timestamps (appended in time order),
+        # so `since` queries are a binary search instead of a scan
+        self._completion_events: deque = deque(maxlen=max_history)
+        self._timestamps: deque = deque(maxlen=max_history)
+        # Connected client -> (frame queue, writer task)
+        self._active_websockets: Dict[WebSocket, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        # (client, frame queue) pairs, rebuilt only when membership changes so
+        # the broadcast task doesn't copy the dict for every batch
+        self._clients: Tuple[Tuple[WebSocket, asyncio.Queue], ...] = ()
         self._lock = threading.Lock()
+        # Events appended in total, and how many of those have been broadcast
+        self._seq = 0
+        self._sent_seq = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Set (and replaced) on every new event, for long-polling readers
+        self._arrived: Optional[asyncio.Event] = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Bind the broadcaster to the app's event loop. Call before starting
+        broadcast_pending_events.
+
+        Args:
+            loop: The running event loop
+        """
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._arrived = asyncio.Event()
 
     def add_event(self, target_group: int) -> None:
         """
@@ -25,20 +80,38 @@ class EventBroadcaster:
         Args:
             target_group: The track/target group that completed
         """
-        event = {
-            "targetGroup": target_group,
-            "layer": target_group,
-            "timestamp": time.time()
-        }
-
         with self._lock:
+            # Timestamped under the lock so the history stays in time order
+            event = {
+                "targetGroup": target_group,
+                "layer": target_group,
+                "timestamp": time.time()
+            }
             self._completion_events.append(event)
-            self._pending_events.append(event)
+            self._timestamps.append(event["timestamp"])
+            self._seq += 1
+
+        if self._loop is not None:
+            if self._on_loop():
+                # OSC handler running on the loop itself: wake directly
+                self._notify()
+            else:
+                self._loop.call_soon_threadsafe(self._notify)
+
+        logger.info("✅ Completion event added for targetGroup %s", target_group)
 
-            if len(self._completion_events) > self.max_history:
-                self._completion_events.pop(0)
+    def _notify(self) -> None:
+        """Wake the broadcast task and any long-polling readers (on the loop)."""
+        self._wakeup.set()
+        self._arrived.set()
+        self._arrived = asyncio.Event()
 
-        print(f"✅ Completion event added for targetGroup {target_group}")
+    def _on_loop(self) -> bool:
+        """Whether the caller is running on the attached event loop."""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
 
     def get_events(self, since: float = None) -> List[Dict]:
         """
@@ -52,59 +125,135 @@ class EventBroadcaster:
         """
         with self._lock:
             if since is None:
-                return self._completion_events.copy()
+                return list(self._completion_events)
             else:
-                return [e for e in self._completion_events if e["timestamp"] > since]
+                start = bisect.bisect_right(self._timestamps, since)
+                return list(islice(self._completion_events, start, None))
+
+    async def wait_for_events(self, since: float, timeout: float) -> List[Dict]:
+        """
+        Long-poll variant of get_events: if nothing is newer than `since`,
+        wait up to `timeout` seconds for the next event before answering.
+
+        Args:
+            since: Timestamp to return events after
+            timeout: Maximum seconds to wait
+
+        Returns:
+            List of completion event dictionaries (empty on timeout)
+        """
+        events = self.get_events(since)
+        if events or self._arrived is None:
+            return events
+
+        try:
+            await asyncio.wait_for(self._arrived.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.get_events(since)
 
     def add_websocket(self, websocket: WebSocket) -> None:
         """
-        Register a WebSocket connection for broadcasts.
+        Register a WebSocket connection for broadcasts and start its writer.
+        Must be called on the attached event loop.
 
         Args:
             websocket: WebSocket connection to add
         """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+        writer = asyncio.create_task(self._write_frames(websocket, queue))
         with self._lock:
-            self._active_websockets.add(websocket)
-        print(f"🔌 WebSocket client connected (total: {len(self._active_websockets)})")
+            self._active_websockets[websocket] = (queue, writer)
+            self._refresh_clients()
+        logger.info("🔌 WebSocket client connected (total: %s)", len(self._active_websockets))
+
+        # Wake the broadcast task so events held while no client was
+        # connected go out now
+        if self._wakeup is not None:
+            self._wakeup.set()
 
     def remove_websocket(self, websocket: WebSocket) -> None:
         """
-        Unregister a WebSocket connection.
+        Unregister a WebSocket connection and stop its writer.
 
         Args:
             websocket: WebSocket connection to remove
         """
         with self._lock:
-            self._active_websockets.discard(websocket)
-        print(f"🔌 WebSocket client disconnected (total: {len(self._active_websockets)})")
+            entry = self._active_websockets.pop(websocket, None)
+            self._refresh_clients()
+        if entry is None:
+            return
+        entry[1].cancel()
+        logger.info("🔌 WebSocket client disconnected (total: %s)", len(self._active_websockets))
+
+    def _refresh_clients(self) -> None:
+        """Rebuild the client snapshot; call with the lock held."""
+        self._clients = tuple((websocket, queue) for websocket, (queue, _)
+                              in self._active_websockets.items())
+
+    async def _write_frames(self, websocket: WebSocket, queue: asyncio.Queue) -> None:
+        """
+        Writer task for one client: send its queued frames in order.
+
+        Args:
+            websocket: Client connection
+            queue: The client's frame queue
+        """
+        while True:
+            message = await queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("WebSocket send timed out after %ss, dropping client", self.send_timeout)
+                break
+            except Exception as e:
+                logger.warning("WebSocket send error: %s", e)
+                break
+
+        # Drop the client; the writer is finishing on its own, so it is not cancelled
+        with self._lock:
+            self._active_websockets.pop(websocket, None)
+            self._refresh_clients()
+
+        # A timed-out send may have left half a frame on the wire. Close the
+        # socket (1013: try again later) so the client sees the disconnect
+        # and reconnects instead of waiting on a dead stream
+        with contextlib.suppress(Exception):
+            await websocket.close(code=1013)
 
     async def broadcast_pending_events(self) -> None:
         """
-        Background task that broadcasts pending events to all connected WebSockets.
-        Should be run as an asyncio task.
+        Background task that hands pending events to every client's writer.
+        Should be run as an asyncio task on the loop passed to attach_loop.
         """
         while True:
-            events_to_send = []
-            websockets_to_notify = []
+            await self._wakeup.wait()
+            if self.coalesce_window and self._seq - self._sent_seq == 1:
+                await asyncio.sleep(self.coalesce_window)
+            self._wakeup.clear()
 
+            # Everything appended since the last send. With no client
+            # connected the cursor stays put, so those events go out once one
+            # connects (up to max_history of them)
             with self._lock:
-                if self._pending_events and self._active_websockets:
-                    events_to_send = self._pending_events.copy()
-                    self._pending_events.clear()
-                    websockets_to_notify = list(self._active_websockets)
-
-            if events_to_send and websockets_to_notify:
-                disconnected = set()
-                for event in events_to_send:
-                    for websocket in websockets_to_notify:
-                        try:
-                            await websocket.send_json(event)
-                        except Exception as e:
-                            print(f"WebSocket send error: {e}")
-                            disconnected.add(websocket)
-
-                if disconnected:
-                    with self._lock:
-                        self._active_websockets.difference_update(disconnected)
-
-            await asyncio.sleep(0.01)
+                clients = self._clients
+                unsent = min(self._seq - self._sent_seq, len(self._completion_events))
+                if not clients or not unsent:
+                    continue
+                events_to_send = list(islice(self._completion_events,
+                                             len(self._completion_events) - unsent, None))
+                self._sent_seq = self._seq
+
+            # The new events go out as one frame, serialized once and shared
+            # by every client:
+            # {"type": "batch", "events": [{targetGroup, layer, timestamp}, ...]}
+            message = orjson.dumps({"type": "batch", "events": events_to_send}).decode()
+            for websocket, queue in clients:
+                if queue.full():
+                    # Drop-oldest: the writer is still (slowly) draining, so
+                    # keep the client and the most recent completions
+                    queue.get_nowait()
+                    logger.warning("WebSocket client %s frames behind, discarding oldest frame",
+                                   self.max_queued)
+                queue.put_nowait(message)
@@ -1,5 +1,10 @@
+import logging
 import threading
 from typing import Dict, Optional, Tuple
+from pythonosc.osc_message import OscMessage
+
+
+logger = logging.getLogger(__name__)
 
 
 class LoopManager:
@@ -7,31 +12,36 @@ class LoopManager:
     Thread-safe manager for looping melody state.
     Stores melody data per (targetGroup, oscAddress) combination.
     This allows both /melody and /chord to loop on the same targetGroup.
+
+    Reads happen on every completion, writes only when a melody is sent or
+    stopped, so writers publish a fresh copy of the dict under the lock and
+    readers use whatever dict is current without locking (copy-on-write;
+    the published dict is never mutated).
     """
 
     def __init__(self):
-        # Key: (targetGroup, oscAddress) - e.g. (0, "/melody"), (0, "/chord")
-        self._loops: Dict[Tuple[int, str], Dict[str, str]] = {}
+        # Key: (targetGroup, oscAddress) - e.g. (0, "/melody"), (0, "/chord");
+        # value: the encoded OSC message (the address is already in the key)
+        self._loops: Dict[Tuple[int, str], OscMessage] = {}
         self._lock = threading.Lock()
 
-    def add_loop(self, target_group: int, osc_address: str, json_payload: str) -> None:
+    def add_loop(self, target_group: int, osc_address: str, packet: OscMessage) -> None:
         """
         Store loop data for a (targetGroup, oscAddress) combination.
 
         Args:
             target_group: The track/target group ID
             osc_address: OSC path (/melody or /chord)
-            json_payload: Pre-formatted JSON payload string
+            packet: Encoded OSC message to resend on each completion
         """
         key = (target_group, osc_address)
         with self._lock:
-            self._loops[key] = {
-                "address": osc_address,
-                "payload": json_payload
-            }
-        print(f"🔁 Stored loop: {osc_address} targetGroup {target_group}")
+            loops = dict(self._loops)
+            loops[key] = packet
+            self._loops = loops
+        logger.info("🔁 Stored loop: %s targetGroup %s", osc_address, target_group)
 
-    def get_loop(self, target_group: int, osc_address: str) -> Optional[Dict[str, str]]:
+    def get_loop(self, target_group: int, osc_address: str) -> Optional[OscMessage]:
         """
         Retrieve loop data for a specific (targetGroup, oscAddress) combination.
 
@@ -40,11 +50,9 @@ class LoopManager:
             osc_address: OSC path (/melody or /chord)
 
         Returns:
-            Dict with 'address' and 'payload' keys, or None if not looping
+            Encoded OSC message to resend, or None if not looping
         """
-        key = (target_group, osc_address)
-        with self._lock:
-            return self._loops.get(key)
+        return self._loops.get((target_group, osc_address))
 
     def remove_loop(self, target_group: int, osc_address: str) -> None:
         """
@@ -57,8 +65,10 @@ class LoopManager:
         key = (target_group, osc_address)
         with self._lock:
             if key in self._loops:
-                del self._loops[key]
-                print(f"⏹ Removed loop: {osc_address} targetGroup {target_group}")
+                loops = dict(self._loops)
+                del loops[key]
+                self._loops = loops
+                logger.info("⏹ Removed loop: %s targetGroup %s", osc_address, target_group)
 
     def remove_all_for_target_group(self, target_group: int) -> None:
         """
@@ -69,10 +79,10 @@ class LoopManager:
         """
         with self._lock:
             keys_to_remove = [k for k in self._loops.keys() if k[0] == target_group]
-            for key in keys_to_remove:
-                del self._loops[key]
+            if keys_to_remove:
+                self._loops = {k: v for k, v in self._loops.items() if k[0] != target_group}
         if keys_to_remove:
-            print(f"⏹ Removed all loops for targetGroup {target_group}")
+            logger.info("⏹ Removed all loops for targetGroup %s", target_group)
 
     def has_loop(self, target_group: int) -> bool:
         """
@@ -84,11 +94,10 @@ class LoopManager:
         Returns:
             True if looping, False otherwise
         """
-        with self._lock:
-            return target_group in self._loops
+        return any(k[0] == target_group for k in self._loops)
 
     def clear_all(self) -> None:
         """Clear all loop data (stops all loops)."""
         with self._lock:
-            self._loops.clear()
-        print("⏹ Cleared all loop data")
+            self._loops = {}
+        logger.info("⏹ Cleared all loop data")
@@ -1,6 +1,21 @@
-import json
+import logging
+import orjson
 from pythonosc import udp_client
-from typing import Dict, List
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_bundle_builder import IMMEDIATELY, OscBundleBuilder
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+from typing import Dict, List, Tuple, Union
+
+# Destination addresses for send_melody
+MELODY_ADDRESS = "/melody"
+CHORD_ADDRESS = "/chord"
+
+# Largest bundle datagram send_many builds (macOS's default UDP datagram
+# limit is 9216 bytes); bigger melodies still go out as single messages
+MAX_BUNDLE_SIZE = 8192
+
+logger = logging.getLogger(__name__)
 
 
 class OSCService:
@@ -9,12 +24,18 @@ class OSCService:
     Handles sending melodies and chords to SuperCollider on port 7000.
     """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 7000):
+    def __init__(self, host: str = "127.0.0.1", port: int = 7000, debug: bool = False):
         self.host = host
         self.port = port
+        # Print the full payload of every send (off by default: it is on the
+        # per-melody send path)
+        self.debug = debug
         self.client = udp_client.SimpleUDPClient(host, port)
+        # Sends happen on the event loop; with a full socket buffer a blocking
+        # sendto would stall it, so the datagram is dropped instead (see _send)
+        self.client._sock.setblocking(False)
 
-    def send_melody(self, notes: List[Dict], metadata: Dict) -> Dict:
+    def send_melody(self, notes: List[Dict], metadata: Dict) -> Tuple[Dict, OscMessage]:
         """
         Send melody or chord to SuperCollider.
         Routes to /chord or /melody based on chordMode flag.
@@ -24,43 +45,92 @@ class OSCService:
             metadata: Metadata dictionary including chordMode, loop, targetGroup
 
         Returns:
-            Dict with success status and send details
+            (result, packet): dict with success status and send details, and
+            the encoded OSC message, which can be resent as-is for looping
         """
-        is_chord_mode = metadata.get("chordMode", False)
-        osc_address = "/chord" if is_chord_mode else "/melody"
+        get = metadata.get
+        osc_address = CHORD_ADDRESS if get("chordMode", False) else MELODY_ADDRESS
+        target_group = get("targetGroup", 0)
 
         osc_payload = {
             "notes": notes,
             "metadata": metadata
         }
 
-        json_payload = json.dumps(osc_payload)
+        json_payload = orjson.dumps(osc_payload).decode()
 
-        print("\n" + "="*80)
-        print(f"🎵 SENDING OSC MESSAGE")
-        print(f"   Path: {osc_address}")
-        print(f"   Target: {self.host}:{self.port}")
-        print(f"   Loop: {metadata.get('loop', False)}")
-        print(f"   Payload:")
-        print(json.dumps(osc_payload, indent=4))
-        print("="*80 + "\n")
+        logger.info("🎵 Sending %s to %s:%s (%s notes, loop: %s)",
+                    osc_address, self.host, self.port, len(notes), get('loop', False))
+        if self.debug:
+            logger.info("   Payload: %s", json_payload)
 
-        self.client.send_message(osc_address, json_payload)
+        builder = OscMessageBuilder(address=osc_address)
+        builder.add_arg(json_payload)
+        packet = builder.build()
+        sent = self._send(packet)
 
         return {
-            "success": True,
+            "success": sent,
             "address": osc_address,
-            "targetGroup": metadata.get("targetGroup", 0),
+            "targetGroup": target_group,
             "note_count": len(notes)
-        }
+        }, packet
 
-    def resend_message(self, osc_address: str, json_payload: str) -> None:
+    def resend_packet(self, osc_address: str, packet: OscMessage) -> None:
         """
-        Resend a previously formatted OSC message (used for looping).
+        Resend a previously encoded OSC message (used for looping).
+
+        The datagram was built once by send_melody, so this is a plain UDP send.
 
         Args:
-            osc_address: OSC address path (/melody or /chord)
-            json_payload: Pre-formatted JSON string
+            osc_address: OSC address path (/melody or /chord), for logging
+            packet: Encoded message returned by send_melody
+        """
+        logger.info("🔁 Resending %s to %s:%s", osc_address, self.host, self.port)
+        self._send(packet)
+
+    def send_many(self, items: List[Tuple[str, OscMessage]]) -> None:
+        """
+        Resend several encoded messages in as few datagrams as possible.
+
+        Messages are packed into immediate OSC bundles of up to
+        MAX_BUNDLE_SIZE bytes; a lone message is sent unwrapped.
+
+        Args:
+            items: (osc_address, packet) pairs, as stored for looping
+        """
+        batch: List[OscMessage] = []
+        size = 16  # "#bundle" tag plus timetag
+        for osc_address, packet in items:
+            logger.info("🔁 Resending %s to %s:%s", osc_address, self.host, self.port)
+            if batch and size + 4 + packet.size > MAX_BUNDLE_SIZE:
+                self._send_batch(batch)
+                batch, size = [], 16
+            batch.append(packet)
+            size += 4 + packet.size  # size prefix plus message
+        if batch:
+            self._send_batch(batch)
+
+    def _send_batch(self, packets: List[OscMessage]) -> None:
+        """Send one message as-is, or several as a single bundle."""
+        if len(packets) == 1:
+            self._send(packets[0])
+            return
+        builder = OscBundleBuilder(IMMEDIATELY)
+        for packet in packets:
+            builder.add_content(packet)
+        self._send(builder.build())
+
+    def _send(self, content: Union[OscMessage, OscBundle]) -> bool:
+        """
+        Send a message or bundle without blocking.
+
+        Returns:
+            False if the socket buffer was full and the datagram was dropped
         """
-        print(f"🔁 Resending {osc_address} to {self.host}:{self.port}")
-        self.client.send_message(osc_address, json_payload)
+        try:
+            self.client.send(content)
+            return True
+        except BlockingIOError:
+            logger.warning("⚠️ OSC send buffer full, dropped datagram to %s:%s", self.host, self.port)
+            return False
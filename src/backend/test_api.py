@@ -100,6 +100,64 @@ def test_interpolation():
     print("\n✓ Interpolation test passed!\n")
     return dtw_result
 
+def _reference_dtw(seq_a, seq_b):
+    """Full-matrix DTW alignment (the original pure-Python implementation)."""
+    import numpy as np
+
+    n, m = len(seq_a), len(seq_b)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost[i, j] = abs(seq_a[i - 1] - seq_b[j - 1]) + min(
+                cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1])
+
+    alignment = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        alignment.append((i - 1, j - 1))
+        _, (i, j) = min([(cost[i - 1, j - 1], (i - 1, j - 1)),
+                         (cost[i - 1, j], (i - 1, j)),
+                         (cost[i, j - 1], (i, j - 1))])
+    alignment.reverse()
+    return alignment
+
+def test_dtw_alignment():
+    """Test the banded DTW kernel against the full-matrix alignment"""
+    import random
+    from interpolate import MelodyInterpolator
+
+    print("=" * 60)
+    print("TEST: DTW Alignment")
+    print("=" * 60)
+
+    interpolator = MelodyInterpolator("major", "C")
+    rng = random.Random(42)
+
+    # Equal and unequal lengths, length-1 sequences and identical sequences
+    lengths = [(1, 1), (1, 7), (7, 1), (2, 3), (8, 8), (5, 13), (13, 5), (30, 17), (40, 40)]
+    pairs = [([rng.randint(40, 90) for _ in range(n)], [rng.randint(40, 90) for _ in range(m)])
+             for n, m in lengths]
+    pairs.append((list(range(60, 72)), list(range(60, 72))))
+
+    # Unbanded alignment matches the full-matrix DP exactly
+    for seq_a, seq_b in pairs:
+        assert interpolator._dtw_align(seq_a, seq_b) == _reference_dtw(seq_a, seq_b), (seq_a, seq_b)
+    print(f"\n1. Unbanded alignment matches reference for {len(pairs)} pairs")
+
+    # Banded alignment (including band=0) is still a valid warping path:
+    # starts at (0, 0), ends at (n-1, m-1), moves by unit steps only
+    for seq_a, seq_b in pairs:
+        for band in (0, 1, 2, 4):
+            path = interpolator._dtw_align(seq_a, seq_b, band)
+            assert path[0] == (0, 0), (band, path)
+            assert path[-1] == (len(seq_a) - 1, len(seq_b) - 1), (band, path)
+            for (i0, j0), (i1, j1) in zip(path, path[1:]):
+                assert (i1 - i0, j1 - j0) in ((1, 1), (1, 0), (0, 1)), (band, path)
+    print("2. Banded alignments (band 0, 1, 2, 4) are valid warping paths")
+
+    print("\n✓ DTW alignment test passed!\n")
+
 def test_validation():
     """Test constraint validation"""
     from constraints import MelodyValidator
@@ -182,6 +240,176 @@ def test_combined_workflow():
 
     print("\n✓ Combined workflow test passed!\n")
 
+class _FakeWebSocket:
+    """Stand-in for a WebSocket: records frames, optionally blocks in send."""
+
+    def __init__(self, gate=None):
+        self.frames = []
+        self.closed_with = None
+        self._gate = gate  # asyncio.Event each send waits on (None = no wait)
+
+    async def send_text(self, message):
+        if self._gate is not None:
+            await self._gate.wait()
+        self.frames.append(json.loads(message))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+async def _wait_until(predicate, timeout=2.0):
+    import asyncio
+
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting"
+        await asyncio.sleep(0.005)
+
+async def _broadcast_scenarios():
+    import asyncio
+    import time
+    from services import EventBroadcaster
+
+    # 1. Events added in one loop pass go out as a single batch frame
+    broadcaster = EventBroadcaster()
+    broadcaster.attach_loop(asyncio.get_running_loop())
+    task = asyncio.create_task(broadcaster.broadcast_pending_events())
+    client = _FakeWebSocket()
+    broadcaster.add_websocket(client)
+    broadcaster.add_event(1)
+    broadcaster.add_event(2)
+    await _wait_until(lambda: client.frames)
+    await asyncio.sleep(0.02)
+    assert len(client.frames) == 1, client.frames
+    frame = client.frames[0]
+    assert frame["type"] == "batch"
+    assert [e["targetGroup"] for e in frame["events"]] == [1, 2]
+    assert all(e["layer"] == e["targetGroup"] and "timestamp" in e for e in frame["events"])
+    broadcaster.remove_websocket(client)
+    task.cancel()
+    print("   Batch frame: 2 events in one frame")
+
+    # 2. A slow client loses its oldest queued frames; a fast one gets them all
+    broadcaster = EventBroadcaster(send_timeout=5.0, max_queued=2)
+    broadcaster.attach_loop(asyncio.get_running_loop())
+    task = asyncio.create_task(broadcaster.broadcast_pending_events())
+    gate = asyncio.Event()
+    slow, fast = _FakeWebSocket(gate), _FakeWebSocket()
+    broadcaster.add_websocket(slow)
+    broadcaster.add_websocket(fast)
+    for target_group in range(5):
+        broadcaster.add_event(target_group)
+        await _wait_until(lambda: len(fast.frames) == target_group + 1)
+    gate.set()
+    await _wait_until(lambda: len(slow.frames) == 3)
+    received = lambda ws: [f["events"][0]["targetGroup"] for f in ws.frames]
+    assert received(fast) == [0, 1, 2, 3, 4]
+    # Frame 0 was already in send; 1 and 2 were discarded from the full queue
+    assert received(slow) == [0, 3, 4]
+    assert len(broadcaster._clients) == 2
+    broadcaster.remove_websocket(slow)
+    broadcaster.remove_websocket(fast)
+    task.cancel()
+    print("   Slow client: dropped oldest frames, fast client got all 5")
+
+    # 3. A client stuck in send is dropped after send_timeout and closed
+    broadcaster = EventBroadcaster(send_timeout=0.05)
+    broadcaster.attach_loop(asyncio.get_running_loop())
+    task = asyncio.create_task(broadcaster.broadcast_pending_events())
+    stuck, healthy = _FakeWebSocket(asyncio.Event()), _FakeWebSocket()
+    broadcaster.add_websocket(stuck)
+    broadcaster.add_websocket(healthy)
+    broadcaster.add_event(7)
+    await _wait_until(lambda: stuck.closed_with is not None)
+    assert stuck.closed_with == 1013
+    assert [ws for ws, _ in broadcaster._clients] == [healthy]
+    assert len(healthy.frames) == 1
+    broadcaster.remove_websocket(healthy)
+    task.cancel()
+    print("   Stuck client: removed after send_timeout and closed with 1013")
+
+    # 4. wait_for_events returns on a new event, and [] on timeout
+    broadcaster = EventBroadcaster()
+    broadcaster.attach_loop(asyncio.get_running_loop())
+    since = time.time()
+    asyncio.get_running_loop().call_later(0.05, broadcaster.add_event, 3)
+    events = await broadcaster.wait_for_events(since, 2.0)
+    assert [e["targetGroup"] for e in events] == [3]
+    assert await broadcaster.wait_for_events(time.time(), 0.05) == []
+    print("   Long poll: woke on a new event, empty on timeout")
+
+def test_event_broadcaster():
+    """Test WebSocket batching, slow/stuck clients and long polling"""
+    import asyncio
+
+    print("=" * 60)
+    print("TEST: Event Broadcaster")
+    print("=" * 60 + "\n")
+
+    asyncio.run(_broadcast_scenarios())
+
+    print("\n✓ Event broadcaster test passed!\n")
+
+def test_event_history_boundary():
+    """Test get_events(since) once the history ring has wrapped"""
+    from unittest import mock
+    from services import EventBroadcaster
+    from services import event_broadcaster as broadcaster_module
+
+    print("=" * 60)
+    print("TEST: Event History Boundary")
+    print("=" * 60)
+
+    broadcaster = EventBroadcaster(max_history=5)
+    # Distinct, increasing timestamps 1.0 .. 8.0
+    clock = iter(float(t) for t in range(1, 9))
+    with mock.patch.object(broadcaster_module.time, "time", lambda: next(clock)):
+        for target_group in range(8):
+            broadcaster.add_event(target_group)
+
+    groups = lambda events: [e["targetGroup"] for e in events]
+    # Only the last max_history events are kept
+    assert groups(broadcaster.get_events()) == [3, 4, 5, 6, 7]
+    # Since an evicted timestamp (or one before everything): the whole ring
+    assert groups(broadcaster.get_events(since=0.0)) == [3, 4, 5, 6, 7]
+    assert groups(broadcaster.get_events(since=3.0)) == [3, 4, 5, 6, 7]
+    # Since the oldest retained event: everything after it
+    assert groups(broadcaster.get_events(since=4.0)) == [4, 5, 6, 7]
+    # Since the newest event: nothing
+    assert broadcaster.get_events(since=8.0) == []
+
+    print("\n✓ Event history boundary test passed!\n")
+
+def test_loop_manager():
+    """Test loop storage and its copy-on-write snapshots"""
+    from services import LoopManager
+
+    print("=" * 60)
+    print("TEST: Loop Manager")
+    print("=" * 60)
+
+    manager = LoopManager()
+    manager.add_loop(0, "/melody", "melody-packet")
+    manager.add_loop(0, "/chord", "chord-packet")
+    manager.add_loop(1, "/melody", "other-packet")
+
+    # A reader's snapshot is never mutated by later writes
+    snapshot = manager._loops
+    manager.remove_loop(1, "/melody")
+    assert (1, "/melody") in snapshot
+    assert manager.get_loop(1, "/melody") is None
+    assert not manager.has_loop(1)
+
+    assert manager.get_loop(0, "/chord") == "chord-packet"
+    manager.remove_all_for_target_group(0)
+    assert not manager.has_loop(0)
+    assert len(snapshot) == 3
+
+    manager.add_loop(2, "/melody", "packet")
+    manager.clear_all()
+    assert manager.get_loop(2, "/melody") is None
+
+    print("\n✓ Loop manager test passed!\n")
+
 if __name__ == "__main__":
     print("\n" + "=" * 60)
     print("MelodyGen Backend Test Suite")
@@ -191,7 +419,11 @@ if __name__ == "__main__":
         # Run tests
         test_variations()
         test_interpolation()
+        test_dtw_alignment()
         test_validation()
+        test_event_broadcaster()
+        test_event_history_boundary()
+        test_loop_manager()
         test_combined_workflow()
 
         print("=" * 60)
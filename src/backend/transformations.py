@@ -1,14 +1,89 @@
-from music21 import stream, note, interval, analysis, pitch
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from scale_utils import get_scale_intervals
+from note_array import NoteArray
+from numba import njit
+import numpy as np
 import random
 
+# Pitch class of each root note spelling music21 accepts ('-' and 'b' flats,
+# '#' sharps); octave digits are stripped before the lookup
+_PITCH_CLASS: Dict[str, int] = {
+    letter + accidental: (base + shift) % 12
+    for letter, base in (("C", 0), ("D", 2), ("E", 4), ("F", 5), ("G", 7), ("A", 9), ("B", 11))
+    for accidental, shift in (("", 0), ("#", 1), ("##", 2), ("-", -1), ("--", -2), ("b", -1))
+}
+
+@njit(cache=True)
+def _diatonic_offsets(midi, steps, root_pc, degree_lut, scale_intervals):
+    """
+    Semitone offsets for moving each note by steps[i] scale degrees.
+
+    Same arithmetic as MusicTransformer.find_diatonic_interval, one note per
+    iteration with no Python objects involved.
+    """
+    n_degrees = len(scale_intervals)
+    offsets = np.empty(len(midi), dtype=np.int64)
+    for i in range(len(midi)):
+        current_degree = degree_lut[(midi[i] - root_pc) % 12]
+        total = current_degree + steps[i]
+        target_degree = total % n_degrees
+        octave_adjustment = total // n_degrees
+        offsets[i] = (scale_intervals[target_degree] - scale_intervals[current_degree]
+                      + octave_adjustment * 12)
+    return offsets
+
+@njit(cache=True)
+def _fold_octaves(pitches, low, high):
+    """
+    Move each pitch by whole octaves into [low, high]: down while above high,
+    then up while below low. Closed form per note, one pass over the array.
+    """
+    out = np.empty_like(pitches)
+    for i in range(len(pitches)):
+        p = pitches[i]
+        if p > high:
+            p -= 12 * ((p - high + 11) // 12)
+        if p < low:
+            p += 12 * ((low - p + 11) // 12)
+        out[i] = p
+    return out
+
 class MusicTransformer:
+    # Step range covered by the diatonic interval lookup table (ornaments,
+    # harmonies and counter-melodies stay within an octave and a step)
+    MAX_LUT_STEPS = 8
+
+    # counter_melody motion types
+    _COUNTER_STYLES = {"contrary": 0, "parallel": 1, "oblique": 2}
+
     def __init__(self, scale_type: str, root_note: str):
         self.scale_type = scale_type
         self.root_note = root_note
         self.scale_intervals = get_scale_intervals(scale_type)
-        self.root_pitch = pitch.Pitch(root_note)
+        try:
+            self.root_pitch_class = _PITCH_CLASS[root_note.rstrip("0123456789").capitalize()]
+        except KeyError:
+            raise ValueError(f"Unknown root note: {root_note}") from None
+
+        # Scale degree index (0-based) for each pitch class interval from the
+        # root, including the closest-degree fallback for non-scale notes
+        self._degree_lut = np.array([
+            self.scale_intervals.index(min(self.scale_intervals, key=lambda x: abs(x - pc)))
+            for pc in range(12)
+        ], dtype=np.int8)
+        # Same table as 1-based Python ints for get_scale_degree (indexing a
+        # tuple avoids the NumPy scalar round trip per call)
+        self._degree_of_class = tuple(int(d) + 1 for d in self._degree_lut)
+        self._scale_interval_array = np.array(self.scale_intervals, dtype=np.int8)
+
+        # find_diatonic_interval for every pitch class interval from the root
+        # and step count in [-MAX_LUT_STEPS, MAX_LUT_STEPS]:
+        # _diatonic_lut[pc, steps + MAX_LUT_STEPS]
+        self._diatonic_lut = np.array([
+            [self._degree_interval(int(self._degree_lut[pc]), steps)
+             for steps in range(-self.MAX_LUT_STEPS, self.MAX_LUT_STEPS + 1)]
+            for pc in range(12)
+        ], dtype=np.int8)
         
     def analyze_melody(self, notes: List[Dict]) -> Dict:
         """Analyze melody for intervals, contour, and patterns"""
@@ -20,220 +95,199 @@ class MusicTransformer:
                 'phrases': []
             }
             
-        # Calculate intervals
-        intervals = []
-        for i in range(1, len(notes)):
-            intervals.append(notes[i]['midi'] - notes[i-1]['midi'])
-            
+        # One pass to build the pitch array; intervals, contour, degrees and
+        # range all come from it
+        midi = np.fromiter((n['midi'] for n in notes), dtype=np.int64, count=len(notes))
+        steps = np.diff(midi)
+
         # Analyze contour (up/down/same)
-        contour = []
-        for interv in intervals:
-            if interv > 0:
-                contour.append('up')
-            elif interv < 0:
-                contour.append('down')
-            else:
-                contour.append('same')
-                
-        # Calculate scale degrees
-        scale_degrees = []
-        for note_data in notes:
-            degree = self.get_scale_degree(note_data['midi'])
-            scale_degrees.append(degree)
-            
+        contour = np.where(steps > 0, 'up', np.where(steps < 0, 'down', 'same'))
+
+        # Calculate scale degrees (1-based, closest degree for non-scale notes)
+        scale_degrees = self._degree_lut[(midi - self.root_pitch_class) % 12] + 1
+
         # Detect phrases (simplified - based on time gaps)
         phrases = self.detect_phrases(notes)
-        
+
+        lowest, highest = int(midi.min()), int(midi.max())
+
         return {
-            'intervals': intervals,
-            'contour': contour,
-            'scale_degrees': scale_degrees,
+            'intervals': steps.tolist(),
+            'contour': contour.tolist(),
+            'scale_degrees': scale_degrees.tolist(),
             'phrases': phrases,
             'range': {
-                'lowest': min(n['midi'] for n in notes),
-                'highest': max(n['midi'] for n in notes),
-                'span': max(n['midi'] for n in notes) - min(n['midi'] for n in notes)
+                'lowest': lowest,
+                'highest': highest,
+                'span': highest - lowest
             }
         }
-        
+
     def counter_melody(self, notes: List[Dict], style: str = "contrary") -> List[Dict]:
         """Generate counter melody using contrary/parallel/oblique motion"""
         if not notes:
             return []
-            
-        result = []
-        
-        for i, note_data in enumerate(notes):
-            if style == "contrary":
-                # Move in opposite direction
-                if i > 0:
-                    prev_motion = note_data['midi'] - notes[i-1]['midi']
-                    if prev_motion > 0:  # Melody went up
-                        # Counter melody goes down - try 3rd, 5th, or 6th below
-                        interval = self.find_diatonic_interval(note_data['midi'], -3)
-                    elif prev_motion < 0:  # Melody went down
-                        # Counter melody goes up
-                        interval = self.find_diatonic_interval(note_data['midi'], 3)
-                    else:  # No motion
-                        # Move to nearest consonant interval
-                        interval = self.find_diatonic_interval(note_data['midi'], -5)
-                else:
-                    # Start a third below
-                    interval = self.find_diatonic_interval(note_data['midi'], -3)
-                    
-                counter_pitch = note_data['midi'] + interval
-                
-            elif style == "parallel":
-                # Move in same direction at fixed interval
-                counter_pitch = note_data['midi'] + self.find_diatonic_interval(note_data['midi'], -3)
-                
-            elif style == "oblique":
-                # One voice stays same while other moves
-                if i % 2 == 0:
-                    counter_pitch = notes[0]['midi']  # Pedal tone
-                else:
-                    counter_pitch = note_data['midi'] + self.find_diatonic_interval(note_data['midi'], -5)
-                    
-            else:  # mixed
-                # Combine different motion types
-                if i % 4 == 0:
-                    style_temp = "contrary"
-                elif i % 4 == 1:
-                    style_temp = "parallel"
-                else:
-                    style_temp = "oblique"
-                return self.counter_melody([note_data], style_temp)[0:1] + self.counter_melody(notes[i+1:], style)
-                
-            # Ensure reasonable range
-            if counter_pitch < 36:  # C2
-                counter_pitch += 12
-            elif counter_pitch > 96:  # C7
-                counter_pitch -= 12
-                
-            result.append({
-                **note_data,
-                'midi': counter_pitch,
-                'velocity': note_data.get('velocity', 0.7) * 0.8
-            })
-            
-        return result
+
+        midi = np.fromiter((n['midi'] for n in notes), dtype=np.int64, count=len(notes))
+        index = np.arange(len(notes))
+
+        # Motion type per note: 0 contrary, 1 parallel, 2 oblique. "mixed"
+        # (or any other style) cycles contrary, parallel, oblique; the oblique
+        # notes (2, 5, 8, ...) alternate parity, so pedal and fifth still alternate
+        if style in self._COUNTER_STYLES:
+            kinds = np.full(len(notes), self._COUNTER_STYLES[style])
+        else:
+            kinds = np.array([0, 1, 2])[index % 3]
+
+        # Scale steps per note, resolved to semitone intervals in one pass.
+        # Contrary: start a third below, then move in the opposite direction
+        # (melody up -> 3rd below, down -> 3rd above, no motion -> 5th below).
+        # Parallel: same direction a third below. Oblique: a fifth below.
+        motion = np.diff(midi)
+        contrary_steps = np.concatenate(([-3], np.where(motion > 0, -3, np.where(motion < 0, 3, -5))))
+        steps = np.select([kinds == 0, kinds == 1], [contrary_steps, -3], -5)
+        counter = midi + self._diatonic_offset_array(midi, steps)
+
+        # Oblique: one voice stays the same (pedal on the first note) on even notes
+        counter[(kinds == 2) & (index % 2 == 0)] = midi[0]
+
+        # Ensure reasonable range (C2-C7)
+        counter = np.where(counter < 36, counter + 12, np.where(counter > 96, counter - 12, counter))
+
+        return [{
+            **note_data,
+            'midi': counter_pitch,
+            'velocity': note_data.get('velocity', 0.7) * 0.8
+        } for note_data, counter_pitch in zip(notes, counter.tolist())]
         
-    def harmonize(self, notes: List[Dict], interval_degree: int = 3) -> List[Dict]:
+    def harmonize(self, notes: Union[List[Dict], NoteArray], interval_degree: int = 3) -> Union[List[Dict], NoteArray]:
         """Create harmony line at specified diatonic interval"""
-        harmonized = []
-        
-        for note_data in notes:
-            # Find the diatonic interval in the scale
-            harmony_pitch = note_data['midi'] + self.find_diatonic_interval(note_data['midi'], interval_degree)
-            
-            # Keep in reasonable range
-            while harmony_pitch > 96:  # If too high
-                harmony_pitch -= 12
-            while harmony_pitch < 36:  # If too low
-                harmony_pitch += 12
-                
-            harmonized.append({
-                **note_data,
-                'midi': harmony_pitch,
-                'velocity': note_data.get('velocity', 0.7) * 0.85
-            })
-            
-        return harmonized
-        
-    def transpose(self, notes: List[Dict], semitones: int) -> List[Dict]:
-        """Transpose melody by semitones"""
+        if isinstance(notes, NoteArray):
+            midi = notes.midi
+        else:
+            midi = np.fromiter((n['midi'] for n in notes), dtype=np.int16, count=len(notes))
+
+        # Find the diatonic interval in the scale for every note at once
+        harmony = midi + self._diatonic_offset_array(midi, interval_degree)
+
+        # Keep in reasonable range: octaves down while above C7 (96), then up
+        # while below C2 (36)
+        harmony = _fold_octaves(harmony, 36, 96)
+
+        if isinstance(notes, NoteArray):
+            # Only pitch and velocity change; time/duration arrays are shared
+            return NoteArray(harmony.astype(midi.dtype), notes.time, notes.duration,
+                             notes.velocity * 0.85)
+
+        return [{
+            **note_data,
+            'midi': harmony_pitch,
+            'velocity': note_data.get('velocity', 0.7) * 0.85
+        } for note_data, harmony_pitch in zip(notes, harmony.tolist())]
+        
+    def transpose(self, notes: Union[List[Dict], NoteArray], semitones: int) -> Union[List[Dict], NoteArray]:
+        """Transpose melody by semitones (a NoteArray is shifted in one array op)"""
+        if isinstance(notes, NoteArray):
+            return NoteArray(notes.midi + semitones, notes.time, notes.duration, notes.velocity)
+
         return [{
             **note,
             'midi': note['midi'] + semitones
         } for note in notes]
         
-    def transpose_diatonic(self, notes: List[Dict], scale_steps: int) -> List[Dict]:
+    def transpose_diatonic(self, notes: Union[List[Dict], NoteArray], scale_steps: int) -> Union[List[Dict], NoteArray]:
         """Transpose melody by scale degrees (diatonic transposition)"""
-        transposed = []
-        
-        for note_data in notes:
-            new_pitch = self.transpose_by_scale_degree(note_data['midi'], scale_steps)
-            transposed.append({
-                **note_data,
-                'midi': new_pitch
-            })
-            
-        return transposed
+        if isinstance(notes, NoteArray):
+            offsets = self._diatonic_offset_array(notes.midi, scale_steps)
+            return NoteArray((notes.midi + offsets).astype(notes.midi.dtype),
+                             notes.time, notes.duration, notes.velocity)
+
+        offsets = self.diatonic_intervals(notes, scale_steps)
+
+        return [{
+            **note_data,
+            'midi': note_data['midi'] + offset
+        } for note_data, offset in zip(notes, offsets)]
         
-    def invert(self, notes: List[Dict], axis: str = "center") -> List[Dict]:
+    def invert(self, notes: Union[List[Dict], NoteArray], axis: str = "center") -> Union[List[Dict], NoteArray]:
         """Melodic inversion around axis point"""
-        if not notes:
-            return []
+        if not len(notes):
+            return notes if isinstance(notes, NoteArray) else []
+
+        if isinstance(notes, NoteArray):
+            midi = notes.midi
+        else:
+            midi = np.fromiter((n['midi'] for n in notes), dtype=np.int16, count=len(notes))
             
         # Determine axis point
         if axis == "center":
-            lowest = min(n['midi'] for n in notes)
-            highest = max(n['midi'] for n in notes)
-            axis_pitch = (lowest + highest) // 2
+            axis_pitch = (int(midi.min()) + int(midi.max())) // 2
         elif axis == "first-note":
-            axis_pitch = notes[0]['midi']
+            axis_pitch = int(midi[0])
         elif axis == "last-note":
-            axis_pitch = notes[-1]['midi']
+            axis_pitch = int(midi[-1])
         else:
-            axis_pitch = int(axis) if axis.isdigit() else notes[0]['midi']
-            
-        # Invert around axis
-        inverted = []
-        for note_data in notes:
-            distance = note_data['midi'] - axis_pitch
-            new_pitch = axis_pitch - distance
+            axis_pitch = int(axis) if axis.isdigit() else int(midi[0])
             
-            inverted.append({
-                **note_data,
-                'midi': new_pitch
-            })
-            
-        return inverted
+        # Invert around axis: axis - (midi - axis) for every note at once
+        inverted = (2 * axis_pitch - midi).astype(midi.dtype)
+
+        if isinstance(notes, NoteArray):
+            return NoteArray(inverted, notes.time, notes.duration, notes.velocity)
+
+        return [{
+            **note_data,
+            'midi': new_pitch
+        } for note_data, new_pitch in zip(notes, inverted.tolist())]
         
-    def augment(self, notes: List[Dict], factor: float = 2.0) -> List[Dict]:
+    def augment(self, notes: Union[List[Dict], NoteArray], factor: float = 2.0) -> Union[List[Dict], NoteArray]:
         """Rhythmic augmentation - stretch timing"""
-        if not notes:
-            return []
+        if not len(notes):
+            return notes if isinstance(notes, NoteArray) else []
+
+        if isinstance(notes, NoteArray):
+            times, durations = notes.time, notes.duration
+        else:
+            times = np.fromiter((n['time'] for n in notes), dtype=np.float64, count=len(notes))
+            durations = np.fromiter((n['duration'] for n in notes), dtype=np.float64, count=len(notes))
             
-        # Find the start time
-        start_time = min(n['time'] for n in notes) if notes else 0
-        
+        # Scale onsets relative to the first start time, and every duration
+        start_time = times.min()
+        new_times = start_time + (times - start_time) * factor
+        new_durations = durations * factor
+
+        if isinstance(notes, NoteArray):
+            return NoteArray(notes.midi, new_times, new_durations, notes.velocity)
+
         return [{
             **note,
-            'time': start_time + (note['time'] - start_time) * factor,
-            'duration': note['duration'] * factor
-        } for note in notes]
+            'time': new_time,
+            'duration': new_duration
+        } for note, new_time, new_duration in zip(notes, new_times.tolist(), new_durations.tolist())]
         
-    def diminish(self, notes: List[Dict], factor: float = 0.5) -> List[Dict]:
-        """Rhythmic diminution - compress timing"""
-        if not notes:
-            return []
-            
-        # Find the start time
-        start_time = min(n['time'] for n in notes) if notes else 0
-        
-        return [{
-            **note,
-            'time': start_time + (note['time'] - start_time) * factor,
-            'duration': note['duration'] * factor
-        } for note in notes]
+    def diminish(self, notes: Union[List[Dict], NoteArray], factor: float = 0.5) -> Union[List[Dict], NoteArray]:
+        """Rhythmic diminution - compress timing (augment with a factor below 1)"""
+        return self.augment(notes, factor)
         
     def ornament(self, notes: List[Dict], style: str = "classical") -> List[Dict]:
         """Add melodic ornamentations"""
         result = []
+        # Bound once: the loop body runs per note
+        append, extend = result.append, result.extend
+        rand = random.random
         
         for i, note_data in enumerate(notes):
             if style == "classical":
                 # Add turns and trills on longer notes
-                if note_data['duration'] > 0.5 and random.random() < 0.3:
+                if note_data['duration'] > 0.5 and rand() < 0.3:
                     # Add a turn
-                    result.extend(self.create_turn(note_data))
+                    extend(self.create_turn(note_data))
                 else:
-                    result.append(note_data)
+                    append(note_data)
                     
             elif style == "jazz":
                 # Add grace notes and chromatic approaches
-                if random.random() < 0.2 and i > 0:
+                if rand() < 0.2 and i > 0:
                     # Add chromatic approach
                     grace = {
                         **note_data,
@@ -242,23 +296,23 @@ class MusicTransformer:
                         'duration': 0.1,
                         'velocity': note_data.get('velocity', 0.7) * 0.6
                     }
-                    result.append(grace)
-                result.append(note_data)
+                    append(grace)
+                append(note_data)
                 
             elif style == "baroque":
                 # Add mordents and trills
-                if note_data['duration'] > 0.3 and random.random() < 0.25:
-                    result.extend(self.create_mordent(note_data))
+                if note_data['duration'] > 0.3 and rand() < 0.25:
+                    extend(self.create_mordent(note_data))
                 else:
-                    result.append(note_data)
+                    append(note_data)
                     
             else:  # minimal
                 # Very sparse ornamentation
                 if i == len(notes) - 1 and note_data['duration'] > 1.0:
                     # Simple ending ornament
-                    result.extend(self.create_simple_ending(note_data))
+                    extend(self.create_simple_ending(note_data))
                 else:
-                    result.append(note_data)
+                    append(note_data)
                     
         return result
         
@@ -276,21 +330,25 @@ class MusicTransformer:
             # Original
             developed.extend(pattern)
             
-            # Sequence up by scale steps
-            for degree_offset in [2, 4, -1]:  # up 2nd, up 4th, down 2nd
-                time_offset = len(developed) * 0.5
-                for note_data in pattern:
-                    new_pitch = self.transpose_by_scale_degree(note_data['midi'], degree_offset)
-                    developed.append({
-                        **note_data,
-                        'midi': new_pitch,
-                        'time': note_data['time'] + time_offset
-                    })
-                    
+            # Sequence up by scale steps: up 2nd, up 4th, down 2nd. Pitches for
+            # every repeat come from one lookup, one column per offset
+            degree_offsets = np.array([2, 4, -1]) + self.MAX_LUT_STEPS
+            midi = np.fromiter((n['midi'] for n in pattern), dtype=np.int64, count=pattern_length)
+            pcs = (midi - self.root_pitch_class) % 12
+            repeats = (midi[:, None] + self._diatonic_lut[pcs[:, None], degree_offsets]).T.tolist()
+
+            for repeat, new_pitches in enumerate(repeats, start=1):
+                time_offset = repeat * pattern_length * 0.5
+                developed.extend({
+                    **note_data,
+                    'midi': new_pitch,
+                    'time': note_data['time'] + time_offset
+                } for note_data, new_pitch in zip(pattern, new_pitches))
+
         elif method == "fragment":
             # Break into fragments and recombine
             fragments = self.extract_fragments(notes)
-            developed = self.recombine_fragments(fragments)
+            developed = self.recombine_fragments(notes, fragments)
             
         elif method == "extend":
             # Extend the melody with variations
@@ -321,24 +379,18 @@ class MusicTransformer:
     # Helper methods
     def get_scale_degree(self, midi_note: int) -> int:
         """Get scale degree of a MIDI note"""
-        note_class = midi_note % 12
-        root_class = self.root_pitch.pitchClass
-        
-        # Calculate interval from root
-        interval_from_root = (note_class - root_class) % 12
-        
-        # Find closest scale degree
-        for i, scale_interval in enumerate(self.scale_intervals):
-            if scale_interval == interval_from_root:
-                return i + 1
-                
-        # Not in scale, return closest
-        closest = min(self.scale_intervals, key=lambda x: abs(x - interval_from_root))
-        return self.scale_intervals.index(closest) + 1
+        # Interval from root -> closest scale degree, precomputed in __init__
+        return self._degree_of_class[(midi_note - self.root_pitch_class) % 12]
         
     def find_diatonic_interval(self, midi_note: int, interval_steps: int) -> int:
         """Find diatonic interval (in scale steps, not semitones)"""
-        current_degree = self.get_scale_degree(midi_note) - 1
+        pc = (midi_note - self.root_pitch_class) % 12
+        if -self.MAX_LUT_STEPS <= interval_steps <= self.MAX_LUT_STEPS:
+            return int(self._diatonic_lut[pc, interval_steps + self.MAX_LUT_STEPS])
+        return self._degree_interval(int(self._degree_lut[pc]), interval_steps)
+
+    def _degree_interval(self, current_degree: int, interval_steps: int) -> int:
+        """Semitones from scale degree current_degree (0-based) up/down interval_steps degrees."""
         target_degree = (current_degree + interval_steps) % len(self.scale_intervals)
         
         if target_degree < 0:
@@ -354,6 +406,29 @@ class MusicTransformer:
         
         return semitones
         
+    def diatonic_intervals(self, notes: Union[List[Dict], NoteArray], interval_steps) -> List[int]:
+        """
+        find_diatonic_interval for every note at once.
+
+        Args:
+            notes: Note dicts or a NoteArray
+            interval_steps: Scale steps, either one int for all notes or one per note
+
+        Returns:
+            Semitone offsets as plain ints, one per note
+        """
+        if isinstance(notes, NoteArray):
+            midi = notes.midi
+        else:
+            midi = np.fromiter((n['midi'] for n in notes), dtype=np.int16, count=len(notes))
+        return self._diatonic_offset_array(midi, interval_steps).tolist()
+
+    def _diatonic_offset_array(self, midi: np.ndarray, interval_steps) -> np.ndarray:
+        """diatonic_intervals on a MIDI array, returning the offset array."""
+        steps = np.broadcast_to(np.asarray(interval_steps, dtype=np.int64), midi.shape)
+        return _diatonic_offsets(midi, np.ascontiguousarray(steps), self.root_pitch_class,
+                                 self._degree_lut, self._scale_interval_array)
+
     def transpose_by_scale_degree(self, midi_note: int, degree_offset: int) -> int:
         """Transpose by scale degrees"""
         return midi_note + self.find_diatonic_interval(midi_note, degree_offset)
@@ -450,18 +525,17 @@ class MusicTransformer:
             }
         ]
         
-    def extract_fragments(self, notes: List[Dict], min_length: int = 2, max_length: int = 4) -> List[List[Dict]]:
-        """Extract melodic fragments"""
-        fragments = []
-        
-        for length in range(min_length, min(max_length + 1, len(notes) + 1)):
-            for i in range(len(notes) - length + 1):
-                fragments.append(notes[i:i + length])
-                
-        return fragments
-        
-    def recombine_fragments(self, fragments: List[List[Dict]]) -> List[Dict]:
-        """Recombine fragments in interesting ways"""
+    def extract_fragments(self, notes: List[Dict], min_length: int = 2, max_length: int = 4) -> List[Tuple[int, int]]:
+        """
+        Extract melodic fragments as (start, length) index ranges into notes,
+        so no sub-lists are built for fragments that are never picked.
+        """
+        return [(i, length)
+                for length in range(min_length, min(max_length + 1, len(notes) + 1))
+                for i in range(len(notes) - length + 1)]
+        
+    def recombine_fragments(self, notes: List[Dict], fragments: List[Tuple[int, int]]) -> List[Dict]:
+        """Recombine fragments (ranges from extract_fragments) in interesting ways"""
         if not fragments:
             return []
             
@@ -470,33 +544,33 @@ class MusicTransformer:
         time_offset = 0
         
         for _ in range(4):  # Create 4 fragment combinations
-            if fragments:
-                fragment = random.choice(fragments)
-                for note_data in fragment:
-                    result.append({
-                        **note_data,
-                        'time': note_data['time'] + time_offset
-                    })
-                if fragment:
-                    time_offset = result[-1]['time'] + result[-1]['duration'] + 0.1
+            start, length = random.choice(fragments)
+            for note_data in notes[start:start + length]:
+                result.append({
+                    **note_data,
+                    'time': note_data['time'] + time_offset
+                })
+            if length:
+                time_offset = result[-1]['time'] + result[-1]['duration'] + 0.1
                     
         return result
         
     def create_variation(self, notes: List[Dict]) -> List[Dict]:
         """Create a variation of the melody"""
-        variation = []
-        
-        for i, note_data in enumerate(notes):
-            # Occasionally change pitches
-            if random.random() < 0.3:
-                # Move to nearby scale tone
-                direction = random.choice([-1, 1])
-                new_pitch = self.transpose_by_scale_degree(note_data['midi'], direction)
-                variation.append({
-                    **note_data,
-                    'midi': new_pitch
-                })
-            else:
-                variation.append(note_data.copy())
-                
-        return variation
\ No newline at end of file
+        if not notes:
+            return []
+
+        # Occasionally move a note to a nearby scale tone: direction -1/+1,
+        # or 0 to keep it. Drawn per note in the same order as before, so
+        # seeded batches are unchanged
+        directions = np.array([random.choice([-1, 1]) if random.random() < 0.3 else 0
+                               for _ in notes])
+        changed = directions != 0
+
+        midi = np.fromiter((n['midi'] for n in notes), dtype=np.int64, count=len(notes))
+        pcs = (midi - self.root_pitch_class) % 12
+        deltas = self._diatonic_lut[pcs, directions + self.MAX_LUT_STEPS]
+        new_pitches = np.where(changed, midi + deltas, midi).tolist()
+
+        return [{**note_data, 'midi': new_pitch}
+                for note_data, new_pitch in zip(notes, new_pitches)]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from transformations import MusicTransformer
 import random
 import json
@@ -15,6 +15,56 @@ class VariationGenerator:
         self.scale_type = scale_type
         self.root_note = root_note
 
+        # variation type -> fn(seed_notes) returning (notes, method description);
+        # random parameters are drawn when the entry is called
+        t = self.transformer
+        self._variations = {
+            'transpose_up': lambda n: self._transposed(n, random.randint(1, 7)),
+            'transpose_down': lambda n: self._transposed(n, random.randint(-7, -1)),
+            'transpose_diatonic_up': lambda n: self._transposed_diatonic(n, random.randint(1, 4)),
+            'transpose_diatonic_down': lambda n: self._transposed_diatonic(n, random.randint(-4, -1)),
+            'invert_center': lambda n: (t.invert(n, axis='center'), "Invert around center"),
+            'invert_first': lambda n: (t.invert(n, axis='first-note'), "Invert around first note"),
+            'invert_last': lambda n: (t.invert(n, axis='last-note'), "Invert around last note"),
+            'augment': lambda n: self._stretched(n, "Augment", random.choice([1.5, 2.0, 2.5])),
+            'diminish': lambda n: self._stretched(n, "Diminish", random.choice([0.5, 0.66, 0.75])),
+            'ornament_classical': lambda n: (t.ornament(n, style='classical'), "Classical ornamentation"),
+            'ornament_jazz': lambda n: (t.ornament(n, style='jazz'), "Jazz ornamentation"),
+            'develop_sequence': lambda n: (t.develop(n, method='sequence'), "Sequential development"),
+            'develop_retrograde': lambda n: (t.develop(n, method='retrograde'), "Retrograde"),
+            'harmonize_third': lambda n: (t.harmonize(n, interval_degree=3), "Harmonize at 3rd"),
+            'harmonize_fifth': lambda n: (t.harmonize(n, interval_degree=5), "Harmonize at 5th"),
+            'counter_contrary': lambda n: (t.counter_melody(n, style='contrary'), "Counter melody (contrary)"),
+            'counter_parallel': lambda n: (t.counter_melody(n, style='parallel'), "Counter melody (parallel)"),
+        }
+
+        # generate_combined transform name -> transformer method
+        self._transforms = {
+            'transpose': t.transpose,
+            'transpose_diatonic': t.transpose_diatonic,
+            'invert': t.invert,
+            'augment': t.augment,
+            'diminish': t.diminish,
+            'ornament': t.ornament,
+            'develop': t.develop,
+            'harmonize': t.harmonize,
+            'counter_melody': t.counter_melody,
+        }
+
+    def _transposed(self, seed_notes: List[Dict], semitones: int) -> Tuple[List[Dict], str]:
+        return self.transformer.transpose(seed_notes, semitones=semitones), f"Transpose {semitones:+d} semitones"
+
+    def _transposed_diatonic(self, seed_notes: List[Dict], steps: int) -> Tuple[List[Dict], str]:
+        return (self.transformer.transpose_diatonic(seed_notes, scale_steps=steps),
+                f"Diatonic transpose {steps:+d} steps")
+
+    def _stretched(self, seed_notes: List[Dict], name: str, factor: float) -> Tuple[List[Dict], str]:
+        return self.transformer.augment(seed_notes, factor=factor), f"{name} ×{factor}"
+
+    def _random_transpose(self, seed_notes: List[Dict]) -> Tuple[List[Dict], str]:
+        # Fallback: simple transpose
+        return self.transformer.transpose(seed_notes, semitones=random.randint(-5, 5)), "Transpose (random)"
+
     def generate_batch(self, seed_notes: List[Dict],
                        count: int = 10,
                        variation_types: Optional[List[str]] = None) -> List[Dict]:
@@ -29,8 +79,25 @@ class VariationGenerator:
         Returns:
             List of variation dicts with notes and metadata
         """
+        return list(self.iter_batch(seed_notes, count, variation_types))
+
+    def iter_batch(self, seed_notes: List[Dict],
+                   count: int = 10,
+                   variation_types: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Generate variations one at a time, for callers that consume them
+        as they go (only one variation's notes are held at once).
+
+        Args:
+            seed_notes: List of note dicts with midi, time, duration, velocity
+            count: Number of variations to generate
+            variation_types: List of transformation types to use (None = all)
+
+        Yields:
+            Variation dicts with notes and metadata, as in generate_batch
+        """
         if not seed_notes:
-            return []
+            return
 
         # Default to all variation types
         if variation_types is None:
@@ -45,108 +112,41 @@ class VariationGenerator:
                 'counter_contrary', 'counter_parallel'
             ]
 
-        variations = []
+        # One clock read per batch: ids stay unique through the index, and
+        # all variations of a batch share its creation time
+        created = datetime.now()
+        batch_stamp = created.timestamp()
+        batch_time = created.isoformat()
+
+        # Loop-invariant lookups, bound once
+        choose = random.choice
+        get_variation, fallback = self._variations.get, self._random_transpose
+        seed_length = len(seed_notes)
 
         for i in range(count):
             # Select random variation type
-            var_type = random.choice(variation_types)
-
-            # Generate variation based on type
-            if var_type == 'transpose_up':
-                notes = self.transformer.transpose(seed_notes, semitones=random.randint(1, 7))
-                method = f"Transpose +{notes[0]['midi'] - seed_notes[0]['midi']} semitones"
-
-            elif var_type == 'transpose_down':
-                notes = self.transformer.transpose(seed_notes, semitones=random.randint(-7, -1))
-                method = f"Transpose {notes[0]['midi'] - seed_notes[0]['midi']} semitones"
-
-            elif var_type == 'transpose_diatonic_up':
-                steps = random.randint(1, 4)
-                notes = self.transformer.transpose_diatonic(seed_notes, scale_steps=steps)
-                method = f"Diatonic transpose +{steps} steps"
-
-            elif var_type == 'transpose_diatonic_down':
-                steps = random.randint(-4, -1)
-                notes = self.transformer.transpose_diatonic(seed_notes, scale_steps=steps)
-                method = f"Diatonic transpose {steps} steps"
-
-            elif var_type == 'invert_center':
-                notes = self.transformer.invert(seed_notes, axis='center')
-                method = "Invert around center"
-
-            elif var_type == 'invert_first':
-                notes = self.transformer.invert(seed_notes, axis='first-note')
-                method = "Invert around first note"
-
-            elif var_type == 'invert_last':
-                notes = self.transformer.invert(seed_notes, axis='last-note')
-                method = "Invert around last note"
-
-            elif var_type == 'augment':
-                factor = random.choice([1.5, 2.0, 2.5])
-                notes = self.transformer.augment(seed_notes, factor=factor)
-                method = f"Augment ×{factor}"
-
-            elif var_type == 'diminish':
-                factor = random.choice([0.5, 0.66, 0.75])
-                notes = self.transformer.diminish(seed_notes, factor=factor)
-                method = f"Diminish ×{factor}"
-
-            elif var_type == 'ornament_classical':
-                notes = self.transformer.ornament(seed_notes, style='classical')
-                method = "Classical ornamentation"
-
-            elif var_type == 'ornament_jazz':
-                notes = self.transformer.ornament(seed_notes, style='jazz')
-                method = "Jazz ornamentation"
-
-            elif var_type == 'develop_sequence':
-                notes = self.transformer.develop(seed_notes, method='sequence')
-                method = "Sequential development"
-
-            elif var_type == 'develop_retrograde':
-                notes = self.transformer.develop(seed_notes, method='retrograde')
-                method = "Retrograde"
-
-            elif var_type == 'harmonize_third':
-                notes = self.transformer.harmonize(seed_notes, interval_degree=3)
-                method = "Harmonize at 3rd"
-
-            elif var_type == 'harmonize_fifth':
-                notes = self.transformer.harmonize(seed_notes, interval_degree=5)
-                method = "Harmonize at 5th"
-
-            elif var_type == 'counter_contrary':
-                notes = self.transformer.counter_melody(seed_notes, style='contrary')
-                method = "Counter melody (contrary)"
-
-            elif var_type == 'counter_parallel':
-                notes = self.transformer.counter_melody(seed_notes, style='parallel')
-                method = "Counter melody (parallel)"
-
-            else:
-                # Fallback: simple transpose
-                notes = self.transformer.transpose(seed_notes, semitones=random.randint(-5, 5))
-                method = "Transpose (random)"
+            var_type = choose(variation_types)
+
+            # Generate variation based on type (unknown types fall back to
+            # a random transpose)
+            notes, method = get_variation(var_type, fallback)(seed_notes)
 
             # Create variation record
             variation = {
-                'id': f'var_{i+1}_{datetime.now().timestamp()}',
+                'id': f'var_{i+1}_{batch_stamp}',
                 'notes': notes,
                 'metadata': {
                     'method': method,
                     'variation_type': var_type,
-                    'seed_length': len(seed_notes),
+                    'seed_length': seed_length,
                     'output_length': len(notes),
                     'scale': self.scale_type,
                     'key': self.root_note,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': batch_time
                 }
             }
 
-            variations.append(variation)
-
-        return variations
+            yield variation
 
     def generate_combined(self, seed_notes: List[Dict],
                          transformations: List[Tuple[str, Dict]]) -> List[Dict]:
@@ -160,29 +160,16 @@ class VariationGenerator:
         Returns:
             Transformed notes
         """
-        notes = seed_notes.copy()
+        # Transforms never mutate their input and always return a new list, so
+        # the seed is only copied when no transform ran
+        notes = seed_notes
 
         for transform_name, params in transformations:
-            if transform_name == 'transpose':
-                notes = self.transformer.transpose(notes, **params)
-            elif transform_name == 'transpose_diatonic':
-                notes = self.transformer.transpose_diatonic(notes, **params)
-            elif transform_name == 'invert':
-                notes = self.transformer.invert(notes, **params)
-            elif transform_name == 'augment':
-                notes = self.transformer.augment(notes, **params)
-            elif transform_name == 'diminish':
-                notes = self.transformer.diminish(notes, **params)
-            elif transform_name == 'ornament':
-                notes = self.transformer.ornament(notes, **params)
-            elif transform_name == 'develop':
-                notes = self.transformer.develop(notes, **params)
-            elif transform_name == 'harmonize':
-                notes = self.transformer.harmonize(notes, **params)
-            elif transform_name == 'counter_melody':
-                notes = self.transformer.counter_melody(notes, **params)
-
-        return notes
+            transform = self._transforms.get(transform_name)
+            if transform is not None:
+                notes = transform(notes, **params)
+
+        return seed_notes.copy() if notes is seed_notes else notes
 
     def get_variation_statistics(self, variations: List[Dict]) -> Dict:
         """
@@ -197,28 +184,39 @@ class VariationGenerator:
         if not variations:
             return {}
 
-        total_notes = sum(len(v['notes']) for v in variations)
-        avg_notes = total_notes / len(variations)
-
-        # Count variation types
+        # One pass over the variations: note count, type counts and pitch
+        # range, with min/max taken per variation instead of over a list
+        # of every pitch in the batch
+        total_notes = 0
         type_counts = {}
+        lowest = highest = None
         for v in variations:
+            notes = v['notes']
+            total_notes += len(notes)
+
             var_type = v['metadata']['variation_type']
             type_counts[var_type] = type_counts.get(var_type, 0) + 1
 
-        # Pitch range analysis
-        all_pitches = []
-        for v in variations:
-            all_pitches.extend([n['midi'] for n in v['notes']])
+            if notes:
+                pitches = [n['midi'] for n in notes]
+                low, high = min(pitches), max(pitches)
+                if lowest is None or low < lowest:
+                    lowest = low
+                if highest is None or high > highest:
+                    highest = high
+
+        avg_notes = total_notes / len(variations)
+        if lowest is None:
+            lowest = highest = 0
 
         return {
             'total_variations': len(variations),
             'average_notes_per_variation': round(avg_notes, 2),
             'variation_type_distribution': type_counts,
             'pitch_range': {
-                'lowest': min(all_pitches) if all_pitches else 0,
-                'highest': max(all_pitches) if all_pitches else 0,
-                'span': max(all_pitches) - min(all_pitches) if all_pitches else 0
+                'lowest': lowest,
+                'highest': highest,
+                'span': highest - lowest
             },
             'timestamp': datetime.now().isoformat()
         }
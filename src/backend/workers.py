@@ -0,0 +1,173 @@
+"""
+CPU-bound work behind the variation and interpolation endpoints.
+
+Kept out of main.py so the pool's forkserver preloads only this module and
+the music modules, not the FastAPI app (but see create_executor on how the
+launching script is re-imported). Requests and results cross the process
+boundary as JSON (a str in, orjson bytes back) instead of pickled Pydantic
+models.
+"""
+
+import functools
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+import orjson
+from variations import VariationGenerator
+from interpolate import MelodyInterpolator
+from constraints import MelodyValidator
+
+# Same options as FastAPI's ORJSONResponse, so worker output can be sent as-is
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Generators, interpolators and validators only hold per-key lookup tables
+# built in __init__ and are never mutated afterwards, so one instance per
+# (scale, key) is shared by all requests in a process (and its threads)
+@functools.lru_cache(maxsize=128)
+def get_generator(scale_type: str, root_note: str) -> VariationGenerator:
+    return VariationGenerator(scale_type, root_note)
+
+@functools.lru_cache(maxsize=128)
+def get_interpolator(scale_type: str, root_note: str) -> MelodyInterpolator:
+    return MelodyInterpolator(scale_type, root_note)
+
+@functools.lru_cache(maxsize=128)
+def get_validator(scale_type: str, root_note: str) -> MelodyValidator:
+    return MelodyValidator(scale_type, root_note)
+
+def generate_variations(request: Dict) -> Dict:
+    """
+    Generate (and optionally filter) variations for a VariationRequest.
+
+    Args:
+        request: VariationRequest fields as plain JSON values
+
+    Returns:
+        Response dict for /variation/generate
+    """
+    try:
+        seed_notes = request['notes']
+        scale_type = request.get('scale_type', 'major')
+        root_note = request.get('root_note', 'C')
+
+        # Shared generator for this key
+        generator = get_generator(scale_type, root_note)
+
+        # Generate variations
+        variations = generator.generate_batch(
+            seed_notes,
+            count=request.get('count', 10),
+            variation_types=request.get('variation_types')
+        )
+
+        # Apply constraints if requested
+        if request.get('apply_constraints', True):
+            validator = get_validator(scale_type, root_note)
+
+            reference_range = tuple(request['reference_range']) if request.get('reference_range') else None
+            variations = validator.filter_valid_variations(variations, reference_range)
+
+        # Calculate statistics
+        stats = generator.get_variation_statistics(variations)
+
+        return {
+            "success": True,
+            "variations": variations,
+            "statistics": stats,
+            "seed_info": {
+                "note_count": len(seed_notes),
+                "scale": scale_type,
+                "key": root_note
+            }
+        }
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def interpolate_melodies(request: Dict) -> Dict:
+    """
+    Interpolate between two melodies for an InterpolateRequest.
+
+    Args:
+        request: InterpolateRequest fields as plain JSON values
+
+    Returns:
+        Response dict for /variation/interpolate
+    """
+    try:
+        melody_a = request['melody_a']
+        melody_b = request['melody_b']
+        method = request.get('method', 'dtw')
+        steps = request.get('steps', 5)
+
+        # Shared interpolator for this key
+        interpolator = get_interpolator(request.get('scale_type', 'major'),
+                                        request.get('root_note', 'C'))
+
+        # Perform interpolation
+        if method == "dtw":
+            interpolated = interpolator.dtw_interpolate(melody_a, melody_b, steps, request.get('band'))
+        elif method == "contour":
+            interpolated = interpolator.contour_interpolate(melody_a, melody_b, steps)
+        elif method == "feature":
+            interpolated = interpolator.feature_interpolate(melody_a, melody_b, steps)
+        else:
+            return {"success": False, "error": f"Unknown interpolation method: {method}"}
+
+        return {
+            "success": True,
+            "interpolated_melodies": interpolated,
+            "method": method,
+            "steps": steps,
+            "total_melodies": len(interpolated)
+        }
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def generate_worker(payload: str) -> bytes:
+    """generate_variations from a JSON request string to JSON response bytes."""
+    return orjson.dumps(generate_variations(orjson.loads(payload)), option=_ORJSON_OPTIONS)
+
+def interpolate_worker(payload: str) -> bytes:
+    """interpolate_melodies from a JSON request string to JSON response bytes."""
+    return orjson.dumps(interpolate_melodies(orjson.loads(payload)), option=_ORJSON_OPTIONS)
+
+def _init_worker() -> None:
+    # Workers forked from the same forkserver share its random state; reseed
+    # so concurrent requests don't produce identical variation sequences
+    random.seed()
+
+def create_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for the CPU-bound endpoints, one worker per CPU.
+
+    Workers start lazily on the first submit, when the server already runs
+    threads (log listener, anyio workers), so they come from a forkserver
+    (spawn where that is unavailable) rather than a plain fork, which could
+    copy a lock held by one of those threads.
+
+    The forkserver preloads this module, so workers fork with the music
+    modules (and numba kernels) already imported. multiprocessing still
+    re-imports the launching script in each worker as __mp_main__: under
+    `python main.py` that builds the app and services objects again, but
+    startup hooks don't run, so no OSC server or log listener starts there.
+    Launching with `uvicorn main:app` avoids the re-import.
+
+    Returns:
+        The executor, or None on a single CPU, where worker processes would
+        only add IPC overhead (callers fall back to a thread)
+    """
+    workers = os.cpu_count() or 1
+    if workers < 2:
+        return None
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Replaces the default ["__main__"] preload
+        context.set_forkserver_preload(["workers"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker)